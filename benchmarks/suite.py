@@ -0,0 +1,214 @@
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+from pyrel.relations import BinaryRelation
+
+Pairs = set[tuple[int, int]]
+
+
+class Case(NamedTuple):
+    structure: str
+    size: int
+    density: Optional[float]
+    backend: str
+
+    @property
+    def label(self) -> str:
+        density = "" if self.density is None else f" density={self.density}"
+        return f"{self.structure} n={self.size}{density} {self.backend}"
+
+
+def random_pairs(n: int, density: float, rng: random.Random) -> Pairs:
+    return {(a, b) for a in range(n) for b in range(n) if rng.random() < density}
+
+
+def chain_pairs(n: int) -> Pairs:
+    return {(a, a + 1) for a in range(n - 1)}
+
+
+def total_order_pairs(n: int) -> Pairs:
+    return {(a, b) for a in range(n) for b in range(a, n)}
+
+
+def equivalence_pairs(n: int, classes: int) -> Pairs:
+    members: dict[int, list[int]] = {}
+    for a in range(n):
+        members.setdefault(a % classes, []).append(a)
+    return {
+        pair for group in members.values() for pair in itertools.product(group, group)
+    }
+
+
+def build(case: Case, pairs: Pairs) -> BinaryRelation:
+    domain = set(range(case.size))
+    return BinaryRelation(
+        domain=domain, codomain=domain.copy(), relation=pairs, backend=case.backend
+    )
+
+
+def cases(
+    sizes: list[int], densities: list[float], backends: list[str], seed: int
+) -> Iterator[tuple[Case, Pairs]]:
+    for size, backend in itertools.product(sizes, backends):
+        for density in densities:
+            # Seeded per shape so every backend sees the same relation
+            rng = random.Random(hash((seed, size, density)))
+            case = Case("random", size, density, backend)
+            yield case, random_pairs(size, density, rng)
+        yield Case("chain", size, None, backend), chain_pairs(size)
+        yield Case("total_order", size, None, backend), total_order_pairs(size)
+        classes = max(1, size // 10)
+        yield Case("equivalence", size, None, backend), equivalence_pairs(size, classes)
+
+
+def operations(
+    case: Case, pairs: Pairs, seed: int
+) -> dict[str, tuple[Callable[[], Any], Callable[[Any], Any]]]:
+    # name -> (setup, timed call). Setup runs outside the timer and hands the
+    # call a fresh relation, so memoized answers never leak between repeats.
+    rng = random.Random(seed)
+    n = case.size
+    probes = [(rng.randrange(n), rng.randrange(n)) for _ in range(1000)]
+    other_pairs = random_pairs(n, 0.1, rng)
+    relation = build(case, pairs)
+    other = build(case, other_pairs)
+
+    def fresh() -> BinaryRelation:
+        return build(case, pairs)
+
+    def empty() -> BinaryRelation:
+        return build(case, set())
+
+    def add_all(r: BinaryRelation) -> None:
+        for pair in pairs:
+            r.add_pair(pair)
+
+    def contains_all(r: BinaryRelation) -> None:
+        for pair in probes:
+            pair in r
+
+    result: dict[str, tuple[Callable[[], Any], Callable[[Any], Any]]] = {
+        "add_pair": (empty, add_all),
+        "contains": (lambda: relation, contains_all),
+        "compose": (fresh, lambda r: r.compose(other)),
+        "complement": (fresh, lambda r: r.complement()),
+        "inverse": (fresh, lambda r: r.inverse()),
+        "union": (fresh, lambda r: len(r.union(other))),
+        "intersection": (fresh, lambda r: len(r.intersection(other))),
+        "difference": (fresh, lambda r: len(r.difference(other))),
+        "symmetric_difference": (fresh, lambda r: len(r.symmetric_difference(other))),
+    }
+    for name in sorted(dir(BinaryRelation)):
+        if name.startswith("is_"):
+            result[name] = (fresh, _property_check(name))
+    return result
+
+
+def measure(
+    setup: Callable[[], Any], call: Callable[[Any], Any], repeat: int
+) -> Optional[float]:
+    best = None
+    for _ in range(repeat):
+        subject = setup()
+        start = time.perf_counter()
+        try:
+            call(subject)
+        except NotImplementedError:
+            return None
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(
+    sizes: list[int],
+    densities: list[float],
+    backends: list[str],
+    repeat: int = 3,
+    seed: int = 0,
+    only: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    results = []
+    for case, pairs in cases(sizes, densities, backends, seed):
+        for name, (setup, call) in operations(case, pairs, seed).items():
+            if only and name not in only:
+                continue
+            seconds = measure(setup, call, repeat)
+            if seconds is None:
+                continue
+            results.append({**case._asdict(), "operation": name, "seconds": seconds})
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    # Lines for every measurement at least threshold times slower than before
+    def key(entry: dict[str, Any]) -> tuple:
+        return tuple(entry[field] for field in (*Case._fields, "operation"))
+
+    before = {key(entry): entry["seconds"] for entry in baseline["results"]}
+    regressions = []
+    for entry in current["results"]:
+        old = before.get(key(entry))
+        if old and entry["seconds"] >= old * threshold:
+            case = Case(*key(entry)[:-1])
+            regressions.append(
+                f"{case.label} {entry['operation']}: "
+                f"{old * 1e3:.3f}ms -> {entry['seconds'] * 1e3:.3f}ms"
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pyrel relations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.01, 0.2])
+    parser.add_argument("--backends", nargs="+", default=["set", "bitmatrix"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="Operations to run")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.sizes, args.densities, args.backends, args.repeat, args.seed, args.only
+    )
+    for entry in report["results"]:
+        case = Case(*(entry[field] for field in Case._fields))
+        print(f"{case.label:<40} {entry['operation']:<28} {entry['seconds']:.6f}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+def _property_check(name: str) -> Callable[[BinaryRelation], Any]:
+    return lambda r: getattr(r, name)()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
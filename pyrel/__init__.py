@@ -0,0 +1 @@
+from pyrel.profiling import profile  # noqa: F401
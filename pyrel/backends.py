@@ -0,0 +1,362 @@
+from bisect import bisect_left
+from collections.abc import MutableSet
+from typing import Any, Callable, Iterable, Iterator, Optional, Self
+
+from pyrel.bitmatrix import BitMatrix, Interner
+
+Pair = tuple[Any, Any]
+
+_SHIFT = 32
+_LOW = (1 << _SHIFT) - 1
+
+# Capabilities a storage can advertise; BinaryRelation picks algorithms by them
+#   bitset        rows are integer bitsets (BitMatrix)
+#   successors    successors(a) without a full scan
+#   predecessors  predecessors(b) without a full scan
+#   index         forward/reverse dicts usable directly as the adjacency index
+#   ordered       pairs are kept sorted and support range scans
+#   algebra       same-type set operations run natively, without re-hashing
+SET_CAPABILITIES: frozenset[str] = frozenset()
+
+
+class Backend(MutableSet):
+    # Storage protocol: the MutableSet methods plus a bulk update, neighbour
+    # queries and a copy that keeps the storage type
+    name = "backend"
+    capabilities: frozenset[str] = frozenset()
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[Pair]) -> set:
+        return set(it)
+
+    def update(self, pairs: Iterable[Pair]) -> None:
+        for pair in pairs:
+            self.add(pair)
+
+    def successors(self, a: Any) -> Iterable[Any]:
+        return [y for x, y in self if x == a]
+
+    def predecessors(self, b: Any) -> Iterable[Any]:
+        return [x for x, y in self if y == b]
+
+    def copy(self) -> Self:
+        return self.__class__(self)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({set(self)})"
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class SortedPairs(Backend):
+    # Pairs in one sorted list: compact, bisect lookups and ordered range
+    # scans, at the price of O(n) single inserts
+    name = "sorted"
+    capabilities = frozenset({"successors", "ordered"})
+
+    def __init__(self, pairs: Iterable[Pair] = ()) -> None:
+        if isinstance(pairs, SortedPairs):
+            self._pairs: list[Pair] = list(pairs._pairs)
+        else:
+            self._pairs = _sorted(set(pairs))
+
+    def add(self, pair: Pair) -> None:
+        pairs = self._pairs
+        i = bisect_left(pairs, pair)
+        if i == len(pairs) or pairs[i] != pair:
+            pairs.insert(i, pair)
+
+    def discard(self, pair: Pair) -> None:
+        pairs = self._pairs
+        i = bisect_left(pairs, pair)
+        if i < len(pairs) and pairs[i] == pair:
+            del pairs[i]
+
+    def update(self, pairs: Iterable[Pair]) -> None:
+        new_pairs = [pair for pair in set(pairs) if pair not in self]
+        if new_pairs:
+            self._pairs = _sorted(self._pairs + new_pairs)
+
+    def successors(self, a: Any) -> list[Any]:
+        return [b for _, b in self.between(a, a, inclusive=True)]
+
+    def between(self, lo: Any, hi: Any, inclusive: bool = False) -> Iterator[Pair]:
+        # Pairs (a, b) with lo <= a < hi, or lo <= a <= hi when inclusive
+        pairs = self._pairs
+        i = bisect_left(pairs, (lo,))
+        while i < len(pairs):
+            pair = pairs[i]
+            a = pair[0]
+            if a > hi or (a == hi and not inclusive):
+                return
+            yield pair
+            i += 1
+
+    def __contains__(self, pair: object) -> bool:
+        pairs = self._pairs
+        try:
+            i = bisect_left(pairs, pair)  # type: ignore[arg-type]
+        except TypeError:
+            return False
+        return i < len(pairs) and pairs[i] == pair
+
+    def __iter__(self) -> Iterator[Pair]:
+        return iter(self._pairs)
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+
+class AdjacencyPairs(Backend):
+    # Forward and reverse dict-of-sets; doubles as the relation's adjacency
+    # index, so neighbour queries and joins never build one separately
+    name = "adjacency"
+    capabilities = frozenset({"successors", "predecessors", "index"})
+
+    def __init__(self, pairs: Iterable[Pair] = ()) -> None:
+        self.forward: dict[Any, set[Any]] = {}
+        self.reverse: dict[Any, set[Any]] = {}
+        self._size = 0
+        if isinstance(pairs, AdjacencyPairs):
+            self.forward = {a: bs.copy() for a, bs in pairs.forward.items()}
+            self.reverse = {b: as_.copy() for b, as_ in pairs.reverse.items()}
+            self._size = pairs._size
+        else:
+            self.update(pairs)
+
+    def add(self, pair: Pair) -> None:
+        a, b = pair
+        successors = self.forward.setdefault(a, set())
+        if b not in successors:
+            successors.add(b)
+            self.reverse.setdefault(b, set()).add(a)
+            self._size += 1
+
+    def discard(self, pair: Pair) -> None:
+        a, b = pair
+        successors = self.forward.get(a)
+        if successors is None or b not in successors:
+            return
+        successors.discard(b)
+        if not successors:
+            del self.forward[a]
+        predecessors = self.reverse[b]
+        predecessors.discard(a)
+        if not predecessors:
+            del self.reverse[b]
+        self._size -= 1
+
+    def successors(self, a: Any) -> set[Any]:
+        return self.forward.get(a, set())
+
+    def predecessors(self, b: Any) -> set[Any]:
+        return self.reverse.get(b, set())
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+            successors = self.forward.get(a)
+        except (TypeError, ValueError):
+            return False
+        return successors is not None and b in successors
+
+    def __iter__(self) -> Iterator[Pair]:
+        for a, successors in self.forward.items():
+            for b in successors:
+                yield (a, b)
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class Universe(Interner):
+    # Element table that many relations can share. Each element is hashed once
+    # when interned; a pair is then the integer id(a) << 32 | id(b).
+    def pack(self, a: Any, b: Any) -> int:
+        j = self.intern(b)
+        return self.intern(a) << _SHIFT | j
+
+    def find(self, a: Any, b: Any) -> Optional[int]:
+        # The key of a pair over known elements, without interning anything
+        ids = self.ids
+        i = ids.get(a)
+        j = ids.get(b)
+        if i is None or j is None:
+            return None
+        return i << _SHIFT | j
+
+    def unpack(self, key: int) -> Pair:
+        elements = self.elements
+        return (elements[key >> _SHIFT], elements[key & _LOW])
+
+    def intern(self, elem: Any) -> int:
+        i = super().intern(elem)
+        if i > _LOW:
+            raise OverflowError("A universe holds at most 2**32 elements")
+        return i
+
+
+class PackedPairs(Backend):
+    # Pairs as int keys into a shared Universe. Set operations between
+    # storages on the same universe are plain int-set operations.
+    name = "packed"
+    capabilities = frozenset({"algebra"})
+
+    def __init__(self, universe: Universe, pairs: Iterable[Pair] = ()) -> None:
+        self.universe = universe
+        if isinstance(pairs, PackedPairs) and pairs.universe is universe:
+            self.keys: set[int] = set(pairs.keys)
+        else:
+            pack = universe.pack
+            self.keys = {pack(a, b) for a, b in pairs}
+
+    @classmethod
+    def _from_keys(cls, universe: Universe, keys: set[int]) -> Self:
+        packed = cls.__new__(cls)
+        packed.universe = universe
+        packed.keys = keys
+        return packed
+
+    def copy(self) -> Self:
+        return self._from_keys(self.universe, set(self.keys))
+
+    def add(self, pair: Pair) -> None:
+        self.keys.add(self.universe.pack(*pair))
+
+    def discard(self, pair: Pair) -> None:
+        key = self.universe.find(*pair)
+        if key is not None:
+            self.keys.discard(key)
+
+    def update(self, pairs: Iterable[Pair]) -> None:
+        if isinstance(pairs, PackedPairs) and pairs.universe is self.universe:
+            self.keys |= pairs.keys
+        else:
+            pack = self.universe.pack
+            self.keys.update(pack(a, b) for a, b in pairs)
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            key = self.universe.find(*pair)  # type: ignore[misc]
+        except TypeError:
+            return False
+        return key is not None and key in self.keys
+
+    def __iter__(self) -> Iterator[Pair]:
+        unpack = self.universe.unpack
+        for key in self.keys:
+            yield unpack(key)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __eq__(self, other: object) -> bool:
+        if self._same_universe(other):
+            return self.keys == other.keys  # type: ignore[attr-defined]
+        return super().__eq__(other)
+
+    def __and__(self, other):
+        return self._keywise(other, set.__and__, super().__and__)
+
+    def __or__(self, other):
+        return self._keywise(other, set.__or__, super().__or__)
+
+    def __sub__(self, other):
+        return self._keywise(other, set.__sub__, super().__sub__)
+
+    def __xor__(self, other):
+        return self._keywise(other, set.__xor__, super().__xor__)
+
+    def __iand__(self, other):
+        if not self._same_universe(other):
+            return super().__iand__(other)
+        self.keys &= other.keys
+        return self
+
+    def __ior__(self, other):
+        if not self._same_universe(other):
+            return super().__ior__(other)
+        self.keys |= other.keys
+        return self
+
+    def __isub__(self, other):
+        if not self._same_universe(other):
+            return super().__isub__(other)
+        self.keys -= other.keys
+        return self
+
+    def __ixor__(self, other):
+        if not self._same_universe(other):
+            return super().__ixor__(other)
+        self.keys ^= other.keys
+        return self
+
+    def _same_universe(self, other: object) -> bool:
+        return isinstance(other, PackedPairs) and other.universe is self.universe
+
+    def _keywise(self, other, op, fallback):
+        if not self._same_universe(other):
+            # Re-hashed through pairs, but still packed into this universe
+            result = fallback(other)
+            if result is NotImplemented:
+                return result
+            return PackedPairs(self.universe, result)
+        return self._from_keys(self.universe, op(self.keys, other.keys))
+
+
+BACKENDS: dict[str, Callable[[Iterable[Pair]], Any]] = {
+    "set": set,
+    "sorted": SortedPairs,
+    "adjacency": AdjacencyPairs,
+}
+
+
+def create(
+    name: str, pairs: Iterable[Pair] = (), universe: Optional[Universe] = None
+) -> Any:
+    if name == "packed":
+        return PackedPairs(Universe() if universe is None else universe, pairs)
+    if universe is not None:
+        raise ValueError("A universe requires the packed backend")
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend {name!r}; expected one of {sorted(BACKENDS)}, "
+            "'packed' or 'bitmatrix'"
+        ) from None
+    return factory(pairs)
+
+
+def name_of(storage: Any) -> str:
+    if isinstance(storage, (set, frozenset)):
+        return "set"
+    if isinstance(storage, BitMatrix):
+        return "bitmatrix"
+    return getattr(storage, "name", "view")
+
+
+def capabilities(storage: Any) -> frozenset[str]:
+    if isinstance(storage, (set, frozenset)):
+        return SET_CAPABILITIES
+    return getattr(storage, "capabilities", frozenset())
+
+
+def options(storage: Any) -> dict[str, Any]:
+    # Constructor arguments that rebuild a storage of the same kind. Views
+    # carry the options of the storage they were derived from, if any.
+    name = name_of(storage)
+    if name == "view":
+        return dict(getattr(storage, "options", {}))
+    if name == "packed":
+        return {"backend": name, "universe": storage.universe}
+    if name == "bitmatrix" or name in BACKENDS:
+        return {"backend": name}
+    return {}
+
+
+def _sorted(pairs: Iterable[Pair]) -> list[Pair]:
+    try:
+        return sorted(pairs)
+    except TypeError:
+        raise ValueError("Sorted storage requires orderable elements") from None
@@ -0,0 +1,340 @@
+from collections.abc import MutableSet
+from typing import Any, Iterable, Iterator, Optional, Self
+
+
+class Interner:
+    def __init__(self, elements: Iterable[Any] = ()) -> None:
+        self.elements: list[Any] = []
+        self.ids: dict[Any, int] = {}
+        for elem in elements:
+            self.intern(elem)
+
+    def intern(self, elem: Any) -> int:
+        i = self.ids.get(elem)
+        if i is None:
+            i = len(self.elements)
+            self.ids[elem] = i
+            self.elements.append(elem)
+        return i
+
+    def mask(self, elements: Iterable[Any]) -> int:
+        ids = self.ids
+        result = 0
+        for elem in elements:
+            i = ids.get(elem)
+            if i is not None:
+                result |= 1 << i
+        return result
+
+    def decode(self, bits: int) -> Iterator[Any]:
+        elements = self.elements
+        for i in iter_bits(bits):
+            yield elements[i]
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Interner):
+            return NotImplemented
+        return self is other or self.elements == other.elements
+
+
+# A matrix holding at least one pair per this many cells is transposed
+# through digit strings, which costs per cell but runs entirely in C
+_DENSE_TRANSPOSE = 16
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    # Scans the binary digits once; clearing the low bit instead would copy
+    # the whole int for every bit
+    digits = bin(bits)[:1:-1]
+    i = digits.find("1")
+    while i >= 0:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+def _from_positions(positions: list[int]) -> int:
+    if not positions:
+        return 0
+    buffer = bytearray((positions[-1] >> 3) + 1)
+    for i in positions:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class BitMatrix(MutableSet):
+    capabilities = frozenset({"bitset", "successors"})
+
+    def __init__(
+        self,
+        rows: Interner,
+        columns: Optional[Interner] = None,
+        pairs: Iterable[tuple[Any, Any]] = (),
+    ) -> None:
+        self.row_table = rows
+        self.column_table = rows if columns is None else columns
+        self.rows: list[int] = [0] * len(rows)
+        self._size = 0
+        if isinstance(pairs, BitMatrix) and self._compatible(pairs):
+            self.rows[: len(pairs.rows)] = pairs.rows
+            self._size = len(pairs)
+        else:
+            for pair in pairs:
+                self.add(pair)
+
+    @classmethod
+    def from_rows(cls, rows: Interner, columns: Interner, bit_rows: list[int]) -> Self:
+        matrix = cls.__new__(cls)
+        matrix.row_table = rows
+        matrix.column_table = columns
+        matrix.rows = bit_rows
+        matrix._size = sum(row.bit_count() for row in bit_rows)
+        return matrix
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    @property
+    def homogeneous(self) -> bool:
+        return self.row_table is self.column_table
+
+    def row(self, a: Any) -> int:
+        i = self.row_table.ids.get(a)
+        if i is None or i >= len(self.rows):
+            return 0
+        return self.rows[i]
+
+    def successors(self, a: Any) -> set[Any]:
+        return set(self.column_table.decode(self.row(a)))
+
+    def reserve(
+        self, row_elements: Iterable[Any], column_elements: Iterable[Any]
+    ) -> None:
+        for elem in row_elements:
+            self.row_table.intern(elem)
+        for elem in column_elements:
+            self.column_table.intern(elem)
+        self._grow()
+
+    def add(self, pair: tuple[Any, Any]) -> None:
+        a, b = pair
+        i = self.row_table.intern(a)
+        j = self.column_table.intern(b)
+        self._grow()
+        bit = 1 << j
+        row = self.rows[i]
+        if not row & bit:
+            self.rows[i] = row | bit
+            self._size += 1
+
+    def discard(self, pair: tuple[Any, Any]) -> None:
+        a, b = pair
+        i = self.row_table.ids.get(a)
+        j = self.column_table.ids.get(b)
+        if i is None or j is None or i >= len(self.rows):
+            return
+        bit = 1 << j
+        row = self.rows[i]
+        if row & bit:
+            self.rows[i] = row ^ bit
+            self._size -= 1
+
+    def copy(self) -> Self:
+        return self.from_rows(self.row_table, self.column_table, self.rows.copy())
+
+    def transpose(self) -> Self:
+        rows = self.rows
+        width = len(self.column_table)
+        if rows and self._size * _DENSE_TRANSPOSE >= len(rows) * width:
+            # Dense: lay the rows out as digit strings, least significant
+            # first, and let zip turn them into columns in one C-level pass
+            digits = [format(row, f"0{width}b")[::-1] for row in rows]
+            columns = [int("".join(column)[::-1], 2) for column in zip(*digits)]
+        else:
+            # Sparse: collect the row positions per column and build each
+            # column int once, instead of re-creating it for every set bit
+            positions: list[list[int]] = [[] for _ in range(width)]
+            for i, row in enumerate(rows):
+                for j in iter_bits(row):
+                    positions[j].append(i)
+            columns = [_from_positions(column) for column in positions]
+        return self.from_rows(self.column_table, self.row_table, columns)
+
+    def complement(
+        self, row_elements: Iterable[Any], column_elements: Iterable[Any]
+    ) -> Self:
+        row_mask = self.row_table.mask(row_elements)
+        column_mask = self.column_table.mask(column_elements)
+        rows = [
+            (column_mask & ~row) if row_mask >> i & 1 else 0
+            for i, row in enumerate(self._padded(self.rows))
+        ]
+        return self.from_rows(self.row_table, self.column_table, rows)
+
+    def compose(self, other: "BitMatrix") -> Optional[Self]:
+        if self.column_table != other.row_table:
+            return None
+        other_rows = other.rows
+        limit = len(other_rows)
+        rows = []
+        for row in self.rows:
+            acc = 0
+            for j in iter_bits(row):
+                if j < limit:
+                    acc |= other_rows[j]
+            rows.append(acc)
+        return self.from_rows(self.row_table, other.column_table, rows)
+
+    def transitive_closure(self) -> Self:
+        # Warshall's algorithm with whole rows as bit vectors; needs a
+        # homogeneous matrix so that column k and row k name the same element.
+        rows = self._padded(self.rows).copy()
+        for k, row_k in enumerate(rows):
+            if not row_k:
+                continue
+            bit = 1 << k
+            for i, row in enumerate(rows):
+                if row & bit:
+                    rows[i] = row | row_k
+        return self.from_rows(self.row_table, self.column_table, rows)
+
+    def is_reflexive(self, elements: Iterable[Any]) -> bool:
+        return all(self._diagonal(elem) for elem in elements)
+
+    def is_irreflexive(self, elements: Iterable[Any]) -> bool:
+        return not any(self._diagonal(elem) for elem in elements)
+
+    def is_symmetric(self) -> bool:
+        return self._padded(self.transpose().rows) == self._padded(self.rows)
+
+    def is_antisymmetric(self) -> bool:
+        transposed = self.transpose().rows
+        for i, row in enumerate(self.rows):
+            if i < len(transposed) and row & transposed[i] & ~(1 << i):
+                return False
+        return True
+
+    def is_asymmetric(self) -> bool:
+        transposed = self.transpose().rows
+        for i, row in enumerate(self.rows):
+            if i < len(transposed) and row & transposed[i]:
+                return False
+        return True
+
+    def is_connected(self, elements: Iterable[Any], strong: bool = False) -> bool:
+        # OR each element's row with its column and check it covers the mask
+        elements = list(elements)
+        mask = self.row_table.mask(elements)
+        if mask.bit_count() < len(elements):
+            return len(elements) <= 1 and not strong
+        rows = self._padded(self.rows)
+        columns = self._padded(self.transpose().rows)
+        for i in iter_bits(mask):
+            comparable = rows[i] | columns[i]
+            if not strong:
+                comparable |= 1 << i
+            if mask & ~comparable:
+                return False
+        return True
+
+    def is_transitive(self) -> bool:
+        rows = self.rows
+        limit = len(rows)
+        for row in rows:
+            for j in iter_bits(row):
+                if j < limit and rows[j] & ~row:
+                    return False
+        return True
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+            i = self.row_table.ids.get(a)
+            j = self.column_table.ids.get(b)
+        except (TypeError, ValueError):
+            return False
+        if i is None or j is None or i >= len(self.rows):
+            return False
+        return bool(self.rows[i] >> j & 1)
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        row_elements = self.row_table.elements
+        column_elements = self.column_table.elements
+        for i, row in enumerate(self.rows):
+            a = row_elements[i]
+            for j in iter_bits(row):
+                yield (a, column_elements[j])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, BitMatrix) and self._compatible(other):
+            return self._padded(self.rows) == other._padded(other.rows)
+        return super().__eq__(other)
+
+    def __and__(self, other):
+        return self._rowwise(other, lambda x, y: x & y, super().__and__)
+
+    def __or__(self, other):
+        return self._rowwise(other, lambda x, y: x | y, super().__or__)
+
+    def __sub__(self, other):
+        return self._rowwise(other, lambda x, y: x & ~y, super().__sub__)
+
+    def __xor__(self, other):
+        return self._rowwise(other, lambda x, y: x ^ y, super().__xor__)
+
+    def __iand__(self, other):
+        return self._adopt(self & other, super().__iand__, other)
+
+    def __ior__(self, other):
+        return self._adopt(self | other, super().__ior__, other)
+
+    def __isub__(self, other):
+        return self._adopt(self - other, super().__isub__, other)
+
+    def __ixor__(self, other):
+        return self._adopt(self ^ other, super().__ixor__, other)
+
+    def __repr__(self) -> str:
+        return f"BitMatrix({set(self)})"
+
+    def _compatible(self, other: "BitMatrix") -> bool:
+        return (
+            self.row_table == other.row_table
+            and self.column_table == other.column_table
+        )
+
+    def _rowwise(self, other, op, fallback):
+        if not (isinstance(other, BitMatrix) and self._compatible(other)):
+            return fallback(other)
+        left = self._padded(self.rows)
+        right = other._padded(other.rows)
+        rows = [op(x, y) for x, y in zip(left, right)]
+        return self.from_rows(self.row_table, self.column_table, rows)
+
+    def _adopt(self, result, fallback, other):
+        if not isinstance(result, BitMatrix):
+            return fallback(other)
+        self.rows = result.rows
+        self._size = result._size
+        return self
+
+    def _padded(self, rows: list[int]) -> list[int]:
+        missing = len(self.row_table) - len(rows)
+        return rows + [0] * missing if missing > 0 else rows
+
+    def _diagonal(self, elem: Any) -> bool:
+        j = self.column_table.ids.get(elem)
+        return j is not None and bool(self.row(elem) >> j & 1)
+
+    def _grow(self) -> None:
+        missing = len(self.row_table) - len(self.rows)
+        if missing > 0:
+            self.rows.extend([0] * missing)
+
+    __hash__ = None  # type: ignore[assignment]
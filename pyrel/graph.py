@@ -0,0 +1,215 @@
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from pyrel.bitmatrix import Interner
+
+Successors = Callable[[Any], Iterable[Any]]
+
+
+def strongly_connected_components(
+    nodes: Iterable[Any], successors: Successors
+) -> list[list[Any]]:
+    # Iterative Tarjan; components come out in reverse topological order, so
+    # every component is emitted after all the components it can reach.
+    index: dict[Any, int] = {}
+    lowlink: dict[Any, int] = {}
+    on_stack: set[Any] = set()
+    stack: list[Any] = []
+    components: list[list[Any]] = []
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, it = work[-1]
+            for succ in it:
+                if succ not in index:
+                    index[succ] = lowlink[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(successors(succ))))
+                    break
+                if succ in on_stack and index[succ] < lowlink[node]:
+                    lowlink[node] = index[succ]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def transitive_closure(
+    nodes: Iterable[Any], successors: Successors
+) -> Iterator[tuple[Any, Any]]:
+    # Condense the graph into its SCCs and compute each component's reachable
+    # set as a bitset, sinks first, so every DAG edge is OR-ed exactly once.
+    components = strongly_connected_components(nodes, successors)
+    table = Interner()
+    component_of: dict[Any, int] = {}
+    reach: list[int] = []
+    for c, component in enumerate(components):
+        members = 0
+        for node in component:
+            component_of[node] = c
+            members |= 1 << table.intern(node)
+        bits = 0
+        for node in component:
+            for succ in successors(node):
+                d = component_of[succ]
+                if d == c:
+                    bits |= members
+                else:
+                    bits |= reach[d] | 1 << table.ids[succ]
+        reach.append(bits)
+    for component, bits in zip(components, reach):
+        targets = list(table.decode(bits))
+        for node in component:
+            for target in targets:
+                yield (node, target)
+
+
+def topological_order(
+    nodes: Iterable[Any], successors: Successors
+) -> Optional[list[Any]]:
+    # Kahn's algorithm; None when a cycle (self-loops included) leaves some
+    # nodes with predecessors that are never released
+    nodes = list(nodes)
+    indegree = dict.fromkeys(nodes, 0)
+    for node in nodes:
+        for succ in successors(node):
+            indegree[succ] = indegree.get(succ, 0) + 1
+    queue = deque(node for node, degree in indegree.items() if degree == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for succ in successors(node):
+            indegree[succ] -= 1
+            if indegree[succ] == 0:
+                queue.append(succ)
+    return order if len(order) == len(indegree) else None
+
+
+def find_cycle(nodes: Iterable[Any], successors: Successors) -> Optional[list[Any]]:
+    # Iterative three-colour DFS; returns the nodes of one cycle in order
+    state: dict[Any, int] = {}  # 1 on the current path, 2 finished
+    parent: dict[Any, Any] = {}
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, it = work[-1]
+            for succ in it:
+                seen = state.get(succ)
+                if seen == 1:
+                    cycle = [node]
+                    while cycle[-1] != succ:
+                        cycle.append(parent[cycle[-1]])
+                    cycle.reverse()
+                    return cycle
+                if seen is None:
+                    state[succ] = 1
+                    parent[succ] = node
+                    work.append((succ, iter(successors(succ))))
+                    break
+            else:
+                state[node] = 2
+                work.pop()
+    return None
+
+
+def reachable(start: Any, successors: Successors) -> Iterator[Any]:
+    # Breadth-first, yielding each node reachable in one or more steps once
+    seen = set()
+    queue = deque([start])
+    while queue:
+        for succ in successors(queue.popleft()):
+            if succ not in seen:
+                seen.add(succ)
+                yield succ
+                queue.append(succ)
+
+
+def transitive_reduction(
+    nodes: Iterable[Any], successors: Successors
+) -> Optional[list[tuple[Any, Any]]]:
+    # Covering edges of an acyclic graph, self-loops ignored; None on a cycle.
+    # Nodes are numbered topologically and their reach kept as bitsets, sinks
+    # first. Taking a node's successors in that numbering, anything reachable
+    # through an earlier successor is already covered, so an edge is kept
+    # exactly when its target is not.
+    def proper(node: Any) -> list[Any]:
+        return [succ for succ in successors(node) if succ != node]
+
+    order = topological_order(nodes, proper)
+    if order is None:
+        return None
+    position = {node: i for i, node in enumerate(order)}
+    reach = [0] * len(order)
+    edges = []
+    for node in reversed(order):
+        covered = 0
+        for succ in sorted(proper(node), key=position.__getitem__):
+            j = position[succ]
+            if not covered >> j & 1:
+                edges.append((node, succ))
+            covered |= reach[j] | 1 << j
+        reach[position[node]] = covered
+    return edges
+
+
+class DisjointSet:
+    # Union-find with path compression and union by rank
+    def __init__(self, elements: Iterable[Any] = ()) -> None:
+        self.parent: dict[Any, Any] = {}
+        self.rank: dict[Any, int] = {}
+        for elem in elements:
+            self.add(elem)
+
+    def add(self, elem: Any) -> None:
+        if elem not in self.parent:
+            self.parent[elem] = elem
+            self.rank[elem] = 0
+
+    def find(self, elem: Any) -> Any:
+        parent = self.parent
+        root = elem
+        while parent[root] != root:
+            root = parent[root]
+        while parent[elem] != root:
+            parent[elem], elem = root, parent[elem]
+        return root
+
+    def union(self, a: Any, b: Any) -> None:
+        self.add(a)
+        self.add(b)
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.rank[a] < self.rank[b]:
+            a, b = b, a
+        self.parent[b] = a
+        if self.rank[a] == self.rank[b]:
+            self.rank[a] += 1
+
+    def groups(self) -> dict[Any, list[Any]]:
+        groups: dict[Any, list[Any]] = {}
+        for elem in self.parent:
+            groups.setdefault(self.find(elem), []).append(elem)
+        return groups
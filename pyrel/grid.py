@@ -0,0 +1,187 @@
+import math
+import numbers
+from typing import Any, Callable
+
+
+class Mask:
+    # A set of codomain positions in range(size), one bit per position
+    __slots__ = ("bits", "size")
+
+    def __init__(self, bits: int, size: int) -> None:
+        self.bits = bits
+        self.size = size
+
+    def __and__(self, other: Any) -> "Mask":
+        return Mask(self.bits & self._bits_of(other), self.size)
+
+    def __or__(self, other: Any) -> "Mask":
+        return Mask(self.bits | self._bits_of(other), self.size)
+
+    def __xor__(self, other: Any) -> "Mask":
+        return Mask(self.bits ^ self._bits_of(other), self.size)
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def __eq__(self, other: Any) -> "Mask":  # type: ignore[override]
+        return ~(self ^ other)
+
+    def __ne__(self, other: Any) -> "Mask":  # type: ignore[override]
+        return self ^ other
+
+    def __invert__(self) -> "Mask":
+        return Mask(_full(self.size) & ~self.bits, self.size)
+
+    def __bool__(self) -> bool:
+        # `and`, `or` and `not` cannot be evaluated for a whole row at once
+        raise TypeError("Use &, | and ~ to combine column conditions")
+
+    def _bits_of(self, other: Any) -> int:
+        if isinstance(other, Mask):
+            return other.bits
+        if isinstance(other, bool):
+            return _full(self.size) if other else 0
+        raise TypeError(f"Cannot combine a column condition with {other!r}")
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class Column:
+    # Stands in for every codomain value j + offset, j in range(size), so that
+    # a predicate written for scalars evaluates a whole row in one pass
+    __slots__ = ("size", "offset")
+
+    def __init__(self, size: int, offset: int = 0) -> None:
+        self.size = size
+        self.offset = offset
+
+    def __add__(self, other: Any) -> "Column":
+        if not isinstance(other, numbers.Integral):
+            return NotImplemented
+        return Column(self.size, self.offset + int(other))
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any) -> "Column":
+        if not isinstance(other, numbers.Integral):
+            return NotImplemented
+        return Column(self.size, self.offset - int(other))
+
+    def __mod__(self, other: Any) -> "Residues":
+        if not isinstance(other, numbers.Integral):
+            return NotImplemented
+        if other == 0:
+            raise ZeroDivisionError("integer modulo by zero")
+        return Residues(self, int(other))
+
+    def __lt__(self, other: Any) -> Mask:
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        return self._prefix(math.ceil(other - self.offset))
+
+    def __le__(self, other: Any) -> Mask:
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        return self._prefix(math.floor(other - self.offset) + 1)
+
+    def __gt__(self, other: Any) -> Mask:
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        return ~(self <= other)
+
+    def __ge__(self, other: Any) -> Mask:
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        return ~(self < other)
+
+    def __eq__(self, other: Any) -> Mask:  # type: ignore[override]
+        _check_operand(other, numbers.Real)
+        j = other - self.offset
+        if j != int(j) or not 0 <= j < self.size:
+            return Mask(0, self.size)
+        return Mask(1 << int(j), self.size)
+
+    def __ne__(self, other: Any) -> Mask:  # type: ignore[override]
+        return ~(self == other)
+
+    def __bool__(self) -> bool:
+        raise TypeError("A column has no truth value")
+
+    def __str__(self) -> str:
+        raise TypeError("A column has no string value")
+
+    def _prefix(self, count: int) -> Mask:
+        count = min(max(count, 0), self.size)
+        return Mask(_full(count), self.size)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class Residues:
+    # (j + offset) % modulus for every position j of a column
+    __slots__ = ("column", "modulus")
+
+    def __init__(self, column: Column, modulus: int) -> None:
+        self.column = column
+        self.modulus = modulus
+
+    def __eq__(self, other: Any) -> Mask:  # type: ignore[override]
+        _check_operand(other, numbers.Integral)
+        size = self.column.size
+        k = self.modulus
+        valid = 0 <= other < k if k > 0 else k < other <= 0
+        if not valid:
+            return Mask(0, size)
+        step = abs(k)
+        start = (int(other) - self.column.offset) % step
+        if start >= size:
+            return Mask(0, size)
+        # Bits start, start + step, ... as a geometric series of step-bit words
+        count = (size - start + step - 1) // step
+        pattern = ((1 << (step * count)) - 1) // ((1 << step) - 1)
+        return Mask(pattern << start & _full(size), size)
+
+    def __ne__(self, other: Any) -> Mask:  # type: ignore[override]
+        return ~(self == other)
+
+    def __bool__(self) -> bool:
+        raise TypeError("A column has no truth value")
+
+    def __str__(self) -> str:
+        raise TypeError("A column has no string value")
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def row_mask(
+    predicate: Callable[[Any, Any], Any], a: int, size: int, symbolic: bool = False
+) -> int:
+    # A symbolic row is only built on request: a predicate that inspects the
+    # type or identity of b sees a Column and can answer wrongly without raising
+    if symbolic:
+        try:
+            result = predicate(a, Column(size))
+        except (TypeError, OverflowError, ValueError):
+            # Also non-finite bounds, which math.ceil and math.floor reject
+            result = None
+        if isinstance(result, Mask):
+            return result.bits
+        if isinstance(result, bool):
+            return _full(size) if result else 0
+    # Test each value with the scalar predicate
+    bits = 0
+    for b in range(size):
+        if predicate(a, b):
+            bits |= 1 << b
+    return bits
+
+
+def _check_operand(other: Any, kind: type) -> None:
+    # Falling back to identity comparison would silently answer False
+    if not isinstance(other, kind):
+        raise TypeError(f"Cannot compare a column with {other!r}")
+
+
+def _full(size: int) -> int:
+    return (1 << size) - 1
@@ -0,0 +1,461 @@
+from typing import Any, Callable, Iterator, Optional
+
+Pair = tuple[Any, Any]
+Estimate = tuple[float, float, float]
+
+
+def _meet(a: Optional[frozenset], b: Optional[frozenset]) -> Optional[frozenset]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a & b
+
+
+def _merge(a: Any, b: Any) -> Any:
+    if callable(a) or callable(b):
+        raise ValueError("Operation not implemented for function-based domains.")
+    result = set(a)
+    result.update(b)
+    return result
+
+
+class _Probe:
+    # `pair in probe` calls a planned node's _contains directly; `pair in node`
+    # would plan the node again on every probe
+    __slots__ = ("_contains",)
+
+    def __init__(self, contains: Callable[[Pair], bool]) -> None:
+        self._contains = contains
+
+    def __contains__(self, pair: Pair) -> bool:
+        return self._contains(pair)
+
+
+class LazyRelation:
+    domain: Any
+    codomain: Any
+    relation_class: type
+
+    def union(self, other: Any) -> "LazyRelation":
+        return Union(self, _lift(other))
+
+    def intersection(self, other: Any) -> "LazyRelation":
+        return Intersection(self, _lift(other))
+
+    def difference(self, other: Any) -> "LazyRelation":
+        return Difference(self, _lift(other))
+
+    def symmetric_difference(self, other: Any) -> "LazyRelation":
+        return SymmetricDifference(self, _lift(other))
+
+    def compose(self, other: Any) -> "LazyRelation":
+        other = _lift(other)
+        if self.codomain != other.domain:
+            raise ValueError(
+                "First relation's codomain must be equal to the second relation's "
+                "domain"
+            )
+        return Compose(self, other)
+
+    def inverse(self) -> "LazyRelation":
+        return Inverse(self)
+
+    def restrict(
+        self, domain: Optional[Any] = None, codomain: Optional[Any] = None
+    ) -> "LazyRelation":
+        return Restrict(
+            self,
+            None if domain is None else frozenset(domain),
+            None if codomain is None else frozenset(codomain),
+        )
+
+    def optimize(self) -> "LazyRelation":
+        return self._push(None, None)._reorder()
+
+    def collect(self) -> Any:
+        plan = self.optimize()
+        return plan.relation_class(
+            domain=_copy(plan.domain),
+            codomain=_copy(plan.codomain),
+            relation=set(plan._pairs()),
+        )
+
+    def elements(self) -> Iterator[Pair]:
+        return iter(self)
+
+    def __iter__(self) -> Iterator[Pair]:
+        return self.optimize()._pairs()
+
+    def __contains__(self, pair: Pair) -> bool:
+        return self.optimize()._contains(pair)
+
+    # Plan nodes implement the methods below
+
+    @property
+    def cheap_contains(self) -> bool:
+        return False
+
+    def estimate(self) -> Estimate:
+        raise NotImplementedError
+
+    def forward(self) -> dict[Any, set[Any]]:
+        result: dict[Any, set[Any]] = {}
+        for a, b in self._pairs():
+            result.setdefault(a, set()).add(b)
+        return result
+
+    def _pairs(self) -> Iterator[Pair]:
+        raise NotImplementedError
+
+    def _contains(self, pair: Pair) -> bool:
+        return pair in set(self._pairs())
+
+    def _push(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> "LazyRelation":
+        raise NotImplementedError
+
+    def _reorder(self) -> "LazyRelation":
+        raise NotImplementedError
+
+    def _membership(self) -> Any:
+        # Something that answers `pair in ...` cheaply for this node
+        return _Probe(self._contains) if self.cheap_contains else set(self._pairs())
+
+
+class Source(LazyRelation):
+    def __init__(self, relation: Any) -> None:
+        self.relation = relation
+        self.domain = relation.domain
+        self.codomain = relation.codomain
+        self.relation_class = type(relation)
+
+    @property
+    def cheap_contains(self) -> bool:
+        return True
+
+    def estimate(self) -> Estimate:
+        size = float(len(self.relation))
+        index = self.relation._index
+        if index is not None:
+            return size, float(len(index.forward)), float(len(index.reverse))
+        left = size if callable(self.domain) else min(size, len(self.domain))
+        right = size if callable(self.codomain) else min(size, len(self.codomain))
+        return size, float(left), float(right)
+
+    def forward(self) -> dict[Any, set[Any]]:
+        return self.relation._adjacency().forward
+
+    def scan(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> Iterator[Pair]:
+        _, left, _ = self.estimate()
+        if domain is not None and len(domain) < left:
+            # Few rows requested: look them up through the adjacency index
+            forward = self.forward()
+            for a in domain:
+                for b in forward.get(a, ()):
+                    if codomain is None or b in codomain:
+                        yield (a, b)
+            return
+        for a, b in self.relation.elements():
+            if (domain is None or a in domain) and (codomain is None or b in codomain):
+                yield (a, b)
+
+    def _pairs(self) -> Iterator[Pair]:
+        return self.relation.elements()
+
+    def _contains(self, pair: Pair) -> bool:
+        return pair in self.relation
+
+    def _push(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> LazyRelation:
+        if domain is None and codomain is None:
+            return self
+        return Restrict(self, domain, codomain)
+
+    def _reorder(self) -> LazyRelation:
+        return self
+
+    def __repr__(self) -> str:
+        return f"Source({len(self.relation)} pairs)"
+
+
+class Restrict(LazyRelation):
+    def __init__(
+        self,
+        child: LazyRelation,
+        domain: Optional[frozenset],
+        codomain: Optional[frozenset],
+    ) -> None:
+        self.child = child
+        self.allowed_domain = domain
+        self.allowed_codomain = codomain
+        self.domain = _restricted(child.domain, domain)
+        self.codomain = _restricted(child.codomain, codomain)
+        self.relation_class = child.relation_class
+
+    @property
+    def cheap_contains(self) -> bool:
+        return self.child.cheap_contains
+
+    def estimate(self) -> Estimate:
+        size, left, right = self.child.estimate()
+        if self.allowed_domain is not None and left:
+            size *= min(1.0, len(self.allowed_domain) / left)
+            left = min(left, len(self.allowed_domain))
+        if self.allowed_codomain is not None and right:
+            size *= min(1.0, len(self.allowed_codomain) / right)
+            right = min(right, len(self.allowed_codomain))
+        return size, left, right
+
+    def _pairs(self) -> Iterator[Pair]:
+        if isinstance(self.child, Source):
+            return self.child.scan(self.allowed_domain, self.allowed_codomain)
+        return (pair for pair in self.child._pairs() if self._allows(pair))
+
+    def _contains(self, pair: Pair) -> bool:
+        return self._allows(pair) and self.child._contains(pair)
+
+    def _allows(self, pair: Pair) -> bool:
+        a, b = pair
+        return (self.allowed_domain is None or a in self.allowed_domain) and (
+            self.allowed_codomain is None or b in self.allowed_codomain
+        )
+
+    def _push(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> LazyRelation:
+        return self.child._push(
+            _meet(self.allowed_domain, domain), _meet(self.allowed_codomain, codomain)
+        )
+
+    def _reorder(self) -> LazyRelation:
+        return Restrict(
+            self.child._reorder(), self.allowed_domain, self.allowed_codomain
+        )
+
+    def __repr__(self) -> str:
+        return f"Restrict({self.child!r})"
+
+
+class _Binary(LazyRelation):
+    def __init__(self, left: LazyRelation, right: LazyRelation) -> None:
+        self.left = left
+        self.right = right
+        self.domain = _merge(left.domain, right.domain)
+        self.codomain = _merge(left.codomain, right.codomain)
+        self.relation_class = left.relation_class
+
+    @property
+    def cheap_contains(self) -> bool:
+        return self.left.cheap_contains and self.right.cheap_contains
+
+    def _push(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> LazyRelation:
+        return self.__class__(
+            self.left._push(domain, codomain), self.right._push(domain, codomain)
+        )
+
+    def _reorder(self) -> LazyRelation:
+        return self.__class__(self.left._reorder(), self.right._reorder())
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.left!r}, {self.right!r})"
+
+
+class Union(_Binary):
+    def estimate(self) -> Estimate:
+        left, right = self.left.estimate(), self.right.estimate()
+        return left[0] + right[0], left[1] + right[1], left[2] + right[2]
+
+    def _pairs(self) -> Iterator[Pair]:
+        seen = self.left._membership()
+        if isinstance(seen, _Probe):
+            yield from self.left._pairs()
+        else:
+            yield from seen
+        for pair in self.right._pairs():
+            if pair not in seen:
+                yield pair
+
+    def _contains(self, pair: Pair) -> bool:
+        return self.left._contains(pair) or self.right._contains(pair)
+
+
+class Intersection(_Binary):
+    def estimate(self) -> Estimate:
+        left, right = self.left.estimate(), self.right.estimate()
+        return tuple(min(x, y) for x, y in zip(left, right))  # type: ignore
+
+    def _pairs(self) -> Iterator[Pair]:
+        # Drive from the smaller side and probe the other
+        small, large = self.left, self.right
+        if small.estimate()[0] > large.estimate()[0]:
+            small, large = large, small
+        probe = large._membership()
+        for pair in small._pairs():
+            if pair in probe:
+                yield pair
+
+    def _contains(self, pair: Pair) -> bool:
+        return self.left._contains(pair) and self.right._contains(pair)
+
+
+class Difference(_Binary):
+    def estimate(self) -> Estimate:
+        return self.left.estimate()
+
+    def _pairs(self) -> Iterator[Pair]:
+        probe = self.right._membership()
+        for pair in self.left._pairs():
+            if pair not in probe:
+                yield pair
+
+    def _contains(self, pair: Pair) -> bool:
+        return self.left._contains(pair) and not self.right._contains(pair)
+
+
+class SymmetricDifference(_Binary):
+    def estimate(self) -> Estimate:
+        left, right = self.left.estimate(), self.right.estimate()
+        return left[0] + right[0], left[1] + right[1], left[2] + right[2]
+
+    def _pairs(self) -> Iterator[Pair]:
+        left = self.left._membership()
+        right = self.right._membership()
+        for pair in self.left._pairs():
+            if pair not in right:
+                yield pair
+        for pair in self.right._pairs():
+            if pair not in left:
+                yield pair
+
+    def _contains(self, pair: Pair) -> bool:
+        return self.left._contains(pair) != self.right._contains(pair)
+
+
+class Inverse(LazyRelation):
+    def __init__(self, child: LazyRelation) -> None:
+        self.child = child
+        # Same domain and codomain handling as BinaryRelation.inverse
+        self.domain = child.domain
+        self.codomain = child.codomain
+        self.relation_class = child.relation_class
+
+    @property
+    def cheap_contains(self) -> bool:
+        return self.child.cheap_contains
+
+    def estimate(self) -> Estimate:
+        size, left, right = self.child.estimate()
+        return size, right, left
+
+    def _pairs(self) -> Iterator[Pair]:
+        for a, b in self.child._pairs():
+            yield (b, a)
+
+    def _contains(self, pair: Pair) -> bool:
+        a, b = pair
+        return self.child._contains((b, a))
+
+    def _push(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> LazyRelation:
+        return Inverse(self.child._push(codomain, domain))
+
+    def _reorder(self) -> LazyRelation:
+        return Inverse(self.child._reorder())
+
+    def __repr__(self) -> str:
+        return f"Inverse({self.child!r})"
+
+
+class Compose(LazyRelation):
+    def __init__(self, left: LazyRelation, right: LazyRelation) -> None:
+        self.left = left
+        self.right = right
+        self.domain = left.domain
+        self.codomain = right.codomain
+        self.relation_class = left.relation_class
+
+    def estimate(self) -> Estimate:
+        left, right = self.left.estimate(), self.right.estimate()
+        size = left[0] * right[0] / max(left[2], right[1], 1.0)
+        return size, min(left[1], size), min(right[2], size)
+
+    def _pairs(self) -> Iterator[Pair]:
+        # Hash join on the middle element, de-duplicated one output row at a time
+        successors = self.right.forward()
+        for a, middle in self.left.forward().items():
+            row: set[Any] = set()
+            for b in middle:
+                next_successors = successors.get(b)
+                if next_successors:
+                    row |= next_successors
+            for c in row:
+                yield (a, c)
+
+    def _contains(self, pair: Pair) -> bool:
+        a, c = pair
+        successors = self.right.forward()
+        return any(c in successors.get(b, ()) for b in self.left.forward().get(a, ()))
+
+    def _push(
+        self, domain: Optional[frozenset], codomain: Optional[frozenset]
+    ) -> LazyRelation:
+        return Compose(self.left._push(domain, None), self.right._push(None, codomain))
+
+    def _reorder(self) -> LazyRelation:
+        # Composition is associative: flatten the chain and pick the
+        # parenthesization with the smallest estimated intermediate results.
+        operands = [operand._reorder() for operand in self._chain()]
+        n = len(operands)
+        best: dict[tuple[int, int], tuple[float, LazyRelation]] = {
+            (i, i): (0.0, operand) for i, operand in enumerate(operands)
+        }
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                j = i + length - 1
+                candidates = []
+                for k in range(i, j):
+                    left_cost, left = best[(i, k)]
+                    right_cost, right = best[(k + 1, j)]
+                    plan = Compose(left, right)
+                    cost = left_cost + right_cost + plan.estimate()[0]
+                    candidates.append((cost, plan))
+                best[(i, j)] = min(candidates, key=lambda candidate: candidate[0])
+        return best[(0, n - 1)][1]
+
+    def _chain(self) -> list[LazyRelation]:
+        operands = []
+        for operand in (self.left, self.right):
+            if isinstance(operand, Compose):
+                operands.extend(operand._chain())
+            else:
+                operands.append(operand)
+        return operands
+
+    def __repr__(self) -> str:
+        return f"Compose({self.left!r}, {self.right!r})"
+
+
+def _lift(relation: Any) -> LazyRelation:
+    if isinstance(relation, LazyRelation):
+        return relation
+    return Source(relation)
+
+
+def _restricted(members: Any, allowed: Optional[frozenset]) -> Any:
+    if allowed is None:
+        return members
+    if callable(members):
+        return set(allowed)
+    return {elem for elem in members if elem in allowed}
+
+
+def _copy(members: Any) -> Any:
+    return members if callable(members) else members.copy()
@@ -0,0 +1,117 @@
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterable, Optional
+
+# Worker-side view of the relation being checked. It is installed once per
+# worker process; under the fork start method the parent's index is inherited
+# copy-on-write instead of being pickled for every task.
+_state: dict[str, Any] = {}
+
+# Tasks per worker, so that an early counterexample cancels most of the work
+_CHUNKS_PER_WORKER = 4
+
+
+def first_result(
+    task: Callable[[list[Any]], Any],
+    state: dict[str, Any],
+    items: Iterable[Any],
+    workers: int,
+) -> Any:
+    # Returns the first non-None task result and cancels everything still queued
+    chunks = _chunks(items, workers)
+    if not chunks:
+        return None
+    with _executor(state, workers) as executor:
+        pending = {executor.submit(task, chunk) for chunk in chunks}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return result
+    return None
+
+
+def gather(
+    task: Callable[[list[Any]], Any],
+    state: dict[str, Any],
+    items: Iterable[Any],
+    workers: int,
+) -> list[Any]:
+    chunks = _chunks(items, workers)
+    if not chunks:
+        return []
+    with _executor(state, workers) as executor:
+        return list(executor.map(task, chunks))
+
+
+def transitive_rows(rows: list[Any]) -> Optional[tuple[Any, Any, Any]]:
+    forward = _state["forward"]
+    for a in rows:
+        successors = forward[a]
+        for b in successors:
+            back = forward.get(b)
+            if back is not None and not back <= successors:
+                c = next(c for c in back if c not in successors)
+                return (a, b, c)
+    return None
+
+
+def connected_rows(rows: list[Any]) -> Optional[tuple[Any, Any]]:
+    # Finds a pair (a, b) of domain elements related in neither direction;
+    # in the strong variant a must also be related to itself
+    forward = _state["forward"]
+    reverse = _state["reverse"]
+    domain = _state["domain"]
+    strong = _state["strong"]
+    empty: frozenset = frozenset()
+    for a in rows:
+        comparable = forward.get(a, empty) | reverse.get(a, empty)
+        if not strong:
+            comparable = comparable | {a}
+        if not domain <= comparable:
+            return (a, next(b for b in domain if b not in comparable))
+    return None
+
+
+def compose_rows(rows: list[Any]) -> set[tuple[Any, Any]]:
+    forward = _state["forward"]
+    other_forward = _state["other_forward"]
+    pairs = set()
+    for a in rows:
+        for b in forward[a]:
+            successors = other_forward.get(b)
+            if successors is not None:
+                pairs.update((a, c) for c in successors)
+    return pairs
+
+
+def _install(state: dict[str, Any]) -> None:
+    global _state
+    _state = state
+
+
+def _executor(state: dict[str, Any], workers: int) -> ProcessPoolExecutor:
+    context = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_install,
+        initargs=(state,),
+    )
+
+
+def _chunks(items: Iterable[Any], workers: int) -> list[list[Any]]:
+    items = list(items)
+    if not items:
+        return []
+    count = min(len(items), workers * _CHUNKS_PER_WORKER)
+    size = -(-len(items) // count)
+    chunks = []
+    for start in range(0, len(items), size):
+        stop = start + size
+        chunks.append(items[start:stop])
+    return chunks
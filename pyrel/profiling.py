@@ -0,0 +1,318 @@
+import contextlib
+import functools
+import itertools
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional, Set
+
+from pyrel import backends
+from pyrel.relations import _EMPTY, BinaryRelation, Counterexample
+
+# Public operations timed while a profile is active, besides every is_* check
+_OPERATIONS = (
+    "__contains__",
+    "add_pair",
+    "add_pairs",
+    "remove_pair",
+    "update",
+    "union",
+    "intersection",
+    "difference",
+    "symmetric_difference",
+    "compose",
+    "inverse",
+    "complement",
+    "transitive_closure",
+    "transitive_reduction",
+    "reflexive_closure",
+    "symmetric_closure",
+    "equivalence_closure",
+    "restriction",
+)
+
+# Private traversals whose visits and early exits are charged to the caller
+_SCANS = ("_scan", "_scan_mapping")
+
+
+class MethodStats:
+    __slots__ = (
+        "calls",
+        "seconds",
+        "cache_hits",
+        "pairs_scanned",
+        "early_exits",
+        "exit_positions",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.cache_hits = 0
+        self.pairs_scanned = 0
+        self.early_exits = 0
+        # Pairs visited before each counterexample was found
+        self.exit_positions: list[int] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"MethodStats(calls={self.calls}, seconds={self.seconds:.6f}, "
+            f"cache_hits={self.cache_hits}, pairs_scanned={self.pairs_scanned}, "
+            f"early_exits={self.early_exits})"
+        )
+
+
+class Profile:
+    def __init__(self) -> None:
+        self.methods: dict[str, MethodStats] = {}
+        # Per relation instance, keyed by id(), with a readable label
+        self.relations: dict[int, dict[str, MethodStats]] = {}
+        self.labels: dict[int, str] = {}
+
+    def __getitem__(self, method: str) -> MethodStats:
+        return self.methods[method]
+
+    def report(self, limit: Optional[int] = 20) -> str:
+        rows = sorted(
+            (
+                (stats.seconds, self.labels[key], name, stats)
+                for key, methods in self.relations.items()
+                for name, stats in methods.items()
+            ),
+            key=lambda row: row[0],
+            reverse=True,
+        )
+        lines = [
+            f"{'relation':<36} {'method':<28} {'calls':>7} {'cached':>7} "
+            f"{'scanned':>9} {'exits':>6} {'seconds':>10}"
+        ]
+        for seconds, label, name, stats in rows[:limit]:
+            lines.append(
+                f"{label:<36} {name:<28} {stats.calls:>7} {stats.cache_hits:>7} "
+                f"{stats.pairs_scanned:>9} {stats.early_exits:>6} {seconds:>10.6f}"
+            )
+        return "\n".join(lines)
+
+    def _record(
+        self, name: str, relation: BinaryRelation, frame: "_Frame", cached: bool
+    ) -> None:
+        key = id(relation)
+        if key not in self.relations:
+            self.relations[key] = {}
+        size = _size(relation)
+        pairs = "lazy" if size is None else f"{size} pairs"
+        self.labels[key] = f"{type(relation).__name__}@{key:#x} ({pairs})"
+        for stats in (
+            self.methods.setdefault(name, MethodStats()),
+            self.relations[key].setdefault(name, MethodStats()),
+        ):
+            stats.calls += 1
+            stats.seconds += frame.seconds
+            stats.cache_hits += cached
+            stats.pairs_scanned += frame.scanned
+            if frame.exit_position is not None:
+                stats.early_exits += 1
+                stats.exit_positions.append(frame.exit_position)
+
+
+class _Frame:
+    __slots__ = ("seconds", "scanned", "exit_position")
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.scanned = 0
+        self.exit_position: Optional[int] = None
+
+
+_profiles: list[Profile] = []
+_frames: list[_Frame] = []
+_originals: dict[str, Callable] = {}
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[Profile]:
+    # Methods are only wrapped while at least one profile is active, so
+    # relations pay nothing for instrumentation outside this block
+    result = Profile()
+    _profiles.append(result)
+    if len(_profiles) == 1:
+        _install()
+    try:
+        yield result
+    finally:
+        _profiles.remove(result)
+        if not _profiles:
+            _uninstall()
+
+
+def _install() -> None:
+    names = [name for name in dir(BinaryRelation) if name.startswith("is_")]
+    for name in (*names, *_OPERATIONS):
+        method = getattr(BinaryRelation, name, None)
+        if method is not None:
+            _originals[name] = method
+            setattr(BinaryRelation, name, _timed(name, method))
+    # The default scans keep no count, so counting copies stand in for them
+    for name, scan in zip(_SCANS, (_counting_scan, _counting_scan_mapping)):
+        _originals[name] = getattr(BinaryRelation, name)
+        setattr(BinaryRelation, name, _counted(scan))
+
+
+def _uninstall() -> None:
+    for name, method in _originals.items():
+        setattr(BinaryRelation, name, method)
+    _originals.clear()
+
+
+def _timed(name: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            cached = (name, args, tuple(sorted(kwargs.items()))) in self._cache
+        except TypeError:
+            # Operations taking another relation are never memoized
+            cached = False
+        frame = _Frame()
+        _frames.append(frame)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            frame.seconds = time.perf_counter() - start
+            _frames.pop()
+            for active in _profiles:
+                active._record(name, self, frame, cached)
+
+    return wrapper
+
+
+def _counted(scan: Callable) -> Callable:
+    # A scan that stops at a counterexample reports how far it got
+    @functools.wraps(scan)
+    def wrapper(self, *args, **kwargs):
+        if not _frames:
+            return scan(self, *args, **kwargs)
+        frame = _frames[-1]
+        scanned = frame.scanned
+        result = scan(self, *args, **kwargs)
+        if result is not None:
+            frame.exit_position = frame.scanned - scanned
+        return result
+
+    return wrapper
+
+
+def _charge(visited: int) -> None:
+    # Outer frames include the scans of the calls nested in them
+    for frame in _frames:
+        frame.scanned += visited
+
+
+def _size(relation: BinaryRelation) -> Optional[int]:
+    # Lazy views may have to enumerate (or call a function) to count
+    storage = relation._relation
+    if backends.name_of(storage) == "view":
+        return None
+    return len(storage)
+
+
+def _counting_scan(
+    self: BinaryRelation,
+    reflexive: bool = False,
+    irreflexive: bool = False,
+    symmetric: bool = False,
+    antisymmetric: bool = False,
+    asymmetric: bool = False,
+    transitive: bool = False,
+    connected: bool = False,
+) -> Optional[Counterexample]:
+    # BinaryRelation._scan, also charging the rows and pairs it visits to
+    # every active frame
+    index = self._adjacency()
+    forward = index.forward
+    pairwise = symmetric or antisymmetric or asymmetric or transitive
+    rows: Iterable[tuple[Any, Set[Any], bool]]
+    if reflexive or irreflexive or connected:
+        domain = self._finite_domain()
+        rows = itertools.chain(
+            ((a, forward.get(a, _EMPTY), True) for a in domain),
+            (
+                (a, successors, False)
+                for a, successors in forward.items()
+                if pairwise and a not in domain
+            ),
+        )
+    else:
+        rows = ((a, successors, False) for a, successors in forward.items())
+    visited = 0
+    try:
+        for a, successors, in_domain in rows:
+            if in_domain:
+                visited += 1
+                if reflexive and a not in successors:
+                    return Counterexample("reflexive", (a,))
+                if irreflexive and a in successors:
+                    return Counterexample("irreflexive", ((a, a),))
+                if connected:
+                    comparable = (successors | index.predecessors(a)) & domain
+                    if len(comparable) - (a in comparable) < len(domain) - 1:
+                        b = next(b for b in domain if b != a and b not in comparable)
+                        return Counterexample("connected", (a, b))
+            if not pairwise:
+                continue
+            for b in successors:
+                visited += 1
+                back = forward.get(b, _EMPTY)
+                if a in back:
+                    if asymmetric:
+                        return Counterexample("asymmetric", ((a, b), (b, a)))
+                    if antisymmetric and a != b:
+                        return Counterexample("antisymmetric", ((a, b), (b, a)))
+                elif symmetric:
+                    return Counterexample("symmetric", ((a, b),))
+                if transitive and not back <= successors:
+                    c = next(c for c in back if c not in successors)
+                    return Counterexample("transitive", ((a, b), (b, c)))
+        return None
+    finally:
+        _charge(visited)
+
+
+def _counting_scan_mapping(
+    self: BinaryRelation,
+    functional: bool = False,
+    injective: bool = False,
+    serial: bool = False,
+    surjective: bool = False,
+) -> Optional[Counterexample]:
+    # BinaryRelation._scan_mapping, counting like _counting_scan
+    index = self._adjacency()
+    visited = 0
+    try:
+        if serial:
+            for a in self._finite_domain():
+                visited += 1
+                if a not in index.forward:
+                    return Counterexample("serial", (a,))
+        if surjective:
+            if callable(self.codomain):
+                raise ValueError(
+                    "Operation not implemented for function-based codomains."
+                )
+            for b in self.codomain:
+                visited += 1
+                if b not in index.reverse:
+                    return Counterexample("surjective", (b,))
+        if functional:
+            for a, successors in index.forward.items():
+                visited += 1
+                if len(successors) > 1:
+                    b, c = itertools.islice(successors, 2)
+                    return Counterexample("functional", ((a, b), (a, c)))
+        if injective:
+            for b, predecessors in index.reverse.items():
+                visited += 1
+                if len(predecessors) > 1:
+                    a, c = itertools.islice(predecessors, 2)
+                    return Counterexample("injective", ((a, b), (c, b)))
+        return None
+    finally:
+        _charge(visited)
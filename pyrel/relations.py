@@ -1,6 +1,662 @@
+import copy
+import csv
+import functools
 import itertools
-from subprocess import call
-from typing import Any, Callable, Generator, Optional, Self, Set
+import operator
+import os
+import weakref
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import MutableSet
+from collections.abc import Set as AbstractSet
+from typing import (
+    Any,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Self,
+    Sequence,
+    Set,
+)
+
+from pyrel import backends, graph, grid, parallel, serialization, spill
+from pyrel.lazy import LazyRelation, Source
+from pyrel.bitmatrix import BitMatrix, Interner
+
+_EMPTY: frozenset = frozenset()
+
+
+class _AdjacencyIndex:
+    def __init__(self, pairs: Iterable[tuple[Any, Any]] = ()) -> None:
+        self.forward: dict[Any, set[Any]] = {}
+        self.reverse: dict[Any, set[Any]] = {}
+        # Sorted row keys, built by the first range query and kept current
+        self.keys: Optional[list[Any]] = None
+        self.update(pairs)
+
+    def add(self, a: Any, b: Any) -> None:
+        successors = self.forward.get(a)
+        if successors is None:
+            self.forward[a] = {b}
+        else:
+            successors.add(b)
+        predecessors = self.reverse.get(b)
+        if predecessors is None:
+            self.reverse[b] = {a}
+        else:
+            predecessors.add(a)
+        keys = self.keys
+        if keys is not None:
+            # The forward dict may be shared with the storage, so the row can
+            # exist already; the sorted keys decide whether it is new
+            try:
+                i = bisect_left(keys, a)
+            except TypeError:
+                # Rebuilt (and reported) by the next range query
+                self.keys = None
+                return
+            if i == len(keys) or keys[i] != a:
+                keys.insert(i, a)
+
+    def discard(self, a: Any, b: Any) -> None:
+        successors = self.forward.get(a)
+        if successors is not None:
+            successors.discard(b)
+            if not successors:
+                del self.forward[a]
+        predecessors = self.reverse.get(b)
+        if predecessors is not None:
+            predecessors.discard(a)
+            if not predecessors:
+                del self.reverse[b]
+        keys = self.keys
+        if keys is not None and a not in self.forward:
+            i = bisect_left(keys, a)
+            if i < len(keys) and keys[i] == a:
+                del keys[i]
+
+    def update(self, pairs: Iterable[tuple[Any, Any]]) -> None:
+        for a, b in pairs:
+            self.add(a, b)
+
+    def rows_between(self, lo: Any, hi: Any, inclusive: bool = False) -> list[Any]:
+        # Row keys a with lo <= a < hi, or lo <= a <= hi when inclusive
+        if self.keys is None:
+            try:
+                self.keys = sorted(self.forward)
+            except TypeError:
+                raise ValueError("Range queries require orderable elements") from None
+        keys = self.keys
+        start = bisect_left(keys, lo)
+        stop = bisect_right(keys, hi) if inclusive else bisect_left(keys, hi)
+        return keys[start:stop]
+
+    def successors(self, a: Any) -> Set[Any]:
+        return self.forward.get(a, _EMPTY)
+
+    def predecessors(self, b: Any) -> Set[Any]:
+        return self.reverse.get(b, _EMPTY)
+
+
+class _PropertyTracker:
+    # Counters kept current by every insert and removal:
+    #   loops      pairs (a, a)
+    #   diagonal   pairs (a, a) with a in the domain
+    #   unmatched  pairs (a, b), a != b, whose reverse (b, a) is missing
+    #   mutual     unordered {a, b}, a != b, with both (a, b) and (b, a)
+    def __init__(self, pairs: Set[tuple[Any, Any]], domain: Optional[Set[Any]]) -> None:
+        self.loops = self.diagonal = self.unmatched = self.mutual = 0
+        self.domain = domain
+        for a, b in pairs:
+            if a == b:
+                self.loops += 1
+            elif (b, a) in pairs:
+                self.mutual += 1
+            else:
+                self.unmatched += 1
+        self.mutual //= 2
+        self.reset_domain(pairs, domain)
+
+    def reset_domain(
+        self, pairs: Set[tuple[Any, Any]], domain: Optional[Set[Any]]
+    ) -> None:
+        self.domain = domain
+        if domain is None:
+            self.diagonal = 0
+        else:
+            self.diagonal = sum(1 for elem in domain if (elem, elem) in pairs)
+
+    def add(self, pairs: Set[tuple[Any, Any]], a: Any, b: Any) -> None:
+        # Called before (a, b) is inserted into pairs
+        if a == b:
+            self.loops += 1
+            if self.domain is not None and a in self.domain:
+                self.diagonal += 1
+        elif (b, a) in pairs:
+            self.unmatched -= 1
+            self.mutual += 1
+        else:
+            self.unmatched += 1
+
+    def discard(self, pairs: Set[tuple[Any, Any]], a: Any, b: Any) -> None:
+        # Called before (a, b) is removed from pairs
+        if a == b:
+            self.loops -= 1
+            if self.domain is not None and a in self.domain:
+                self.diagonal -= 1
+        elif (b, a) in pairs:
+            self.unmatched += 1
+            self.mutual -= 1
+        else:
+            self.unmatched -= 1
+
+
+class RelationView(AbstractSet):
+    # Read-only view that always reads the owner's current storage, so it
+    # sees every later mutation whether or not the storage was copied
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner: "BinaryRelation") -> None:
+        self._owner = owner
+
+    @property
+    def _pairs(self) -> Set[tuple[Any, Any]]:
+        return self._owner._relation
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    def copy(self) -> set:
+        return set(self._pairs)
+
+    def __contains__(self, pair: object) -> bool:
+        return pair in self._pairs
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        return iter(self._pairs)
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, RelationView):
+            other = other._pairs
+        return self._pairs == other
+
+    def __repr__(self) -> str:
+        return f"{self._pairs}"
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class _SharedPairs(AbstractSet):
+    # Read-only result of a set operation over its operands' storage. Operands
+    # are flagged as shared and copy their own storage before their next
+    # mutation, so the pairs seen through this object never change.
+    __slots__ = (
+        "operation",
+        "left",
+        "right",
+        "depth",
+        "options",
+        "_size",
+        "__weakref__",
+    )
+
+    def __init__(
+        self,
+        operation: Callable[[Any, Any], Any],
+        left: Set[tuple[Any, Any]],
+        right: Set[tuple[Any, Any]],
+    ) -> None:
+        self.operation = operation
+        self.left = left
+        self.right = right
+        self.depth = 1 + max(_shared_depth(left), _shared_depth(right))
+        # The storage the result becomes when written to: the left operand's,
+        # or the right one's when the left is itself a plain view
+        self.options = backends.options(left) or backends.options(right)
+        self._size: Optional[int] = None
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    @property
+    def finite(self) -> bool:
+        left = _is_finite(self.left)
+        if self.operation is operator.sub:
+            return left
+        if self.operation is operator.and_:
+            return left or _is_finite(self.right)
+        return left and _is_finite(self.right)
+
+    def copy(self) -> set:
+        left = self.left.copy() if isinstance(self.left, _SharedPairs) else self.left
+        right = (
+            self.right.copy() if isinstance(self.right, _SharedPairs) else self.right
+        )
+        if isinstance(left, (set, frozenset)) and isinstance(right, (set, frozenset)):
+            return self.operation(left, right)
+        return set(self)
+
+    def __contains__(self, pair: object) -> bool:
+        operation = self.operation
+        if operation is operator.and_:
+            return pair in self.left and pair in self.right
+        if operation is operator.or_:
+            return pair in self.left or pair in self.right
+        if operation is operator.sub:
+            return pair in self.left and pair not in self.right
+        return (pair in self.left) != (pair in self.right)
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        operation = self.operation
+        left, right = self.left, self.right
+        if operation is operator.and_:
+            # Drive from the smaller side, or the only one that can be listed
+            if not _is_finite(left) or (_is_finite(right) and len(left) > len(right)):
+                left, right = right, left
+            return (pair for pair in left if pair in right)
+        if operation is operator.sub:
+            return (pair for pair in left if pair not in right)
+        if operation is operator.or_:
+            return itertools.chain(left, (pair for pair in right if pair not in left))
+        return itertools.chain(
+            (pair for pair in left if pair not in right),
+            (pair for pair in right if pair not in left),
+        )
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = sum(1 for _ in self)
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"{set(self)}"
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+# Image of an element on which a derived function relation is not defined
+_UNDEFINED = object()
+
+
+class _FunctionPairs(AbstractSet):
+    # Pairs (x, func(x)) computed on demand. Images live in a bounded LRU that
+    # restrictions of the same function share, and iteration can hand whole
+    # chunks of the domain to a batched version of func.
+    def __init__(
+        self,
+        domain: Set[Any] | Callable[[Any], bool],
+        func: Callable[[Any], Any],
+        batch: Optional[Callable[[list[Any]], Iterable[Any]]] = None,
+        cache_size: int = 4096,
+        chunk_size: int = 1024,
+        accept: Optional[Callable[[Any], bool]] = None,
+        images: Optional[OrderedDict] = None,
+    ) -> None:
+        self.domain = domain
+        self.func = func
+        self.batch = batch
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self.accept = accept
+        self._images: OrderedDict = OrderedDict() if images is None else images
+        self._in_domain = _membership_test(domain)
+        self._size: Optional[int] = None
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    @property
+    def finite(self) -> bool:
+        return not callable(self.domain)
+
+    def copy(self) -> set:
+        return set(self)
+
+    def restrict(
+        self,
+        domain: Set[Any] | Callable[[Any], bool],
+        accept: Optional[Callable[[Any], bool]] = None,
+    ) -> "_FunctionPairs":
+        outer = self.accept
+        if outer is not None and accept is not None:
+            inner = accept
+
+            def accept(y: Any) -> bool:
+                return outer(y) and inner(y)
+
+        return _FunctionPairs(
+            domain,
+            self.func,
+            self.batch,
+            self.cache_size,
+            self.chunk_size,
+            outer if accept is None else accept,
+            self._images,
+        )
+
+    def image(self, x: Any) -> Any:
+        images = self._images
+        if x in images:
+            images.move_to_end(x)
+            y = images[x]
+        else:
+            y = self.func(x)
+            self._remember(x, y)
+        if y is _UNDEFINED or (self.accept is not None and not self.accept(y)):
+            return _UNDEFINED
+        return y
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+        except (TypeError, ValueError):
+            return False
+        if not self._in_domain(a):
+            return False
+        y = self.image(a)
+        return y is not _UNDEFINED and y == b
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        if callable(self.domain):
+            raise ValueError("Operation not implemented for function-based domains.")
+        chunk = []
+        for x in self.domain:
+            chunk.append(x)
+            if len(chunk) == self.chunk_size:
+                yield from self._apply(chunk)
+                chunk = []
+        yield from self._apply(chunk)
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = sum(1 for _ in self)
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"{set(self)}"
+
+    def _apply(self, chunk: list[Any]) -> Iterator[tuple[Any, Any]]:
+        if self.batch is not None:
+            missing = [x for x in chunk if x not in self._images]
+            if missing:
+                for x, y in zip(missing, self.batch(missing)):
+                    self._remember(x, y)
+        for x in chunk:
+            y = self.image(x)
+            if y is not _UNDEFINED:
+                yield (x, y)
+
+    def _remember(self, x: Any, y: Any) -> None:
+        images = self._images
+        images[x] = y
+        if len(images) > self.cache_size:
+            images.popitem(last=False)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class _SwappedPairs(AbstractSet):
+    # The inverse of another storage, answered by swapping each pair
+    def __init__(self, pairs: Set[tuple[Any, Any]]) -> None:
+        self.pairs = pairs
+        self.options = backends.options(pairs)
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    @property
+    def finite(self) -> bool:
+        return _is_finite(self.pairs)
+
+    def copy(self) -> set:
+        return set(self)
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+        except (TypeError, ValueError):
+            return False
+        return (b, a) in self.pairs
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        return ((b, a) for a, b in self.pairs)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __repr__(self) -> str:
+        return f"{set(self)}"
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class _PredicatePairs(AbstractSet):
+    # Every (a, b) over the domain and codomain that satisfies a predicate.
+    # Membership is one call; pairs can only be listed over finite sides.
+    def __init__(
+        self,
+        predicate: Callable[[Any, Any], bool],
+        domain: Set[Any] | Callable[[Any], bool],
+        codomain: Set[Any] | Callable[[Any], bool],
+    ) -> None:
+        self.predicate = predicate
+        self.domain = domain
+        self.codomain = codomain
+        self._in_domain = _membership_test(domain)
+        self._in_codomain = _membership_test(codomain)
+        self._size: Optional[int] = None
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    @property
+    def finite(self) -> bool:
+        return not (callable(self.domain) or callable(self.codomain))
+
+    def copy(self) -> set:
+        return set(self)
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+        except (TypeError, ValueError):
+            return False
+        return self._in_domain(a) and self._in_codomain(b) and self.predicate(a, b)
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        if not self.finite:
+            raise ValueError(
+                "Operation not implemented for function-based domains and codomains"
+            )
+        predicate = self.predicate
+        codomain = list(self.codomain)
+        for a in self.domain:
+            for b in codomain:
+                if predicate(a, b):
+                    yield (a, b)
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = sum(1 for _ in self)
+        return self._size
+
+    def __repr__(self) -> str:
+        if not self.finite:
+            return f"{{(a, b) | {self.predicate!r}}}"
+        return f"{set(self)}"
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class _ClosurePairs(AbstractSet):
+    # The transitive (and optionally reflexive) closure of a set of edges.
+    # Only the edges are stored; each element's reachable set is computed by a
+    # search the first time a pair starting there is asked for, then memoized.
+    def __init__(
+        self,
+        edges: Iterable[tuple[Any, Any]],
+        domain: Set[Any],
+        reflexive: bool = False,
+    ) -> None:
+        self.forward: dict[Any, set[Any]] = {}
+        for a, b in edges:
+            self.forward.setdefault(a, set()).add(b)
+        self.domain = domain
+        self.reflexive = reflexive
+        self._reach: dict[Any, frozenset[Any]] = {}
+        self._size: Optional[int] = None
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    def copy(self) -> set:
+        return set(self)
+
+    def reach(self, a: Any) -> frozenset[Any]:
+        reach = self._reach.get(a)
+        if reach is None:
+            reach = frozenset(graph.reachable(a, self._successors))
+            if self.reflexive and a in self.domain:
+                reach |= {a}
+            self._reach[a] = reach
+        return reach
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+            return b in self.reach(a)
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        nodes = dict.fromkeys(self.domain)
+        nodes.update(dict.fromkeys(self.forward))
+        for a in nodes:
+            for b in self.reach(a):
+                yield (a, b)
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = sum(1 for _ in self)
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"{set(self)}"
+
+    def _successors(self, a: Any) -> Set[Any]:
+        return self.forward.get(a, _EMPTY)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def _is_finite(pairs: Any) -> bool:
+    return getattr(pairs, "finite", True)
+
+
+def _shared_depth(pairs: Any) -> int:
+    return pairs.depth if isinstance(pairs, _SharedPairs) else 0
+
+
+# Deeper chains of shared results are materialized instead of stacked, so a
+# membership test never fans out over more than this many levels.
+_MAX_SHARED_DEPTH = 4
+
+# Dead sharer references are dropped once this many have accumulated
+_PRUNE_SHARERS = 32
+
+
+def _cached(method: Callable) -> Callable:
+    # Results live until the next mutation; derived relations are handed out as
+    # copies so callers can never edit the cached instance.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            result = self._cache[key]
+        except KeyError:
+            result = self._cache[key] = method(self, *args, **kwargs)
+        if isinstance(result, BinaryRelation):
+            return result.copy()
+        return result
+
+    return wrapper
+
+
+def _membership_test(members: Any) -> Callable[[Any], bool]:
+    # Resolve a domain or codomain into a single membership predicate up front
+    # so add_pair does not re-dispatch on its kind for every insert.
+    if isinstance(members, type):
+        return lambda elem: isinstance(elem, members)
+    if callable(members):
+        return members
+    # Sets and ranges answer membership in O(1) already; other finite
+    # containers are snapshotted into a frozenset when their elements allow it.
+    if not isinstance(members, (set, frozenset, dict, range)):
+        try:
+            return frozenset(members).__contains__
+        except TypeError:
+            pass
+    return members.__contains__
+
+
+def _copy_members(
+    members: Set[Any] | Callable[[Any], bool]
+) -> Set[Any] | Callable[[Any], bool]:
+    return members if callable(members) else members.copy()
+
+
+def _join_members(
+    members: Set[Any] | Callable[[Any], bool],
+    other_members: Set[Any] | Callable[[Any], bool],
+) -> Set[Any] | Callable[[Any], bool]:
+    # Finite sides merge into a set; a predicate on either side makes the
+    # result a predicate accepting members of both
+    if callable(members) or callable(other_members):
+        left = _membership_test(members)
+        right = _membership_test(other_members)
+        return lambda x: left(x) or right(x)
+    result = members.copy()
+    result.update(other_members)
+    return result
+
+
+def _meet_members(
+    members: Set[Any] | Callable[[Any], bool],
+    subset: Optional[Set[Any] | Callable[[Any], bool]],
+) -> Set[Any] | Callable[[Any], bool]:
+    # Intersect a domain or codomain with a restricting set or predicate
+    if subset is None:
+        return _copy_members(members)
+    if callable(subset):
+        if callable(members):
+            outer = _membership_test(members)
+            inner = _membership_test(subset)
+            return lambda x: outer(x) and inner(x)
+        test = _membership_test(subset)
+        return {x for x in members if test(x)}
+    test = _membership_test(members)
+    return {x for x in subset if test(x)}
+
+
+class Counterexample(NamedTuple):
+    # The violated property and the elements or pairs that witness it
+    name: str
+    witness: tuple
+
+
+Verdict = bool | Optional[Counterexample]
 
 
 class BinaryRelation:
@@ -11,29 +667,204 @@ class BinaryRelation:
         relation: Optional[Set[tuple[Any, Any]]] = None,
         from_func: bool = False,
         func: Optional[Callable[[Any], Any]] = None,
+        dense: bool = False,
+        tracked: bool = False,
+        backend: Optional[str] = None,
+        universe: Optional[backends.Universe] = None,
     ) -> None:
+        if backend == "bitmatrix":
+            dense = True
+        elif backend is not None and dense:
+            raise ValueError(
+                f"Dense relations use the bitmatrix backend, not {backend}"
+            )
+        if dense:
+            if from_func or callable(domain) or callable(codomain):
+                raise ValueError("Dense relations require finite domains and codomains")
+            # A dense relation without an explicit codomain is homogeneous
+            if codomain is None:
+                codomain = domain
         self._domain = domain
         if codomain is None:
             self._codomain: Set[Any] | Callable[[Any], bool] = set()
         else:
             self._codomain = codomain
-        if relation is None:
-            self._relation = set()
+        self._index: Optional[_AdjacencyIndex] = None
+        self._version = 0
+        self._cache: dict[tuple, Any] = {}
+        # Weak references to relations and views that alias this storage
+        self._sharers: list[weakref.ref] = []
+        if dense:
+            rows = Interner(domain)
+            columns = rows if codomain == domain else Interner(codomain)
+            self._relation: Set[tuple[Any, Any]] = BitMatrix(
+                rows, columns, relation or ()
+            )
         else:
-            self._relation = relation
+            if backend is None:
+                backend = "set" if universe is None else "packed"
+            self._relation = backends.create(backend, relation or (), universe)
         if from_func:
             if domain is None or func is None:
                 raise ValueError
             self._func = func
+            self._relation = _FunctionPairs(self._domain, func)
         self._from_func = from_func
+        self._in_domain = _membership_test(self._domain)
+        self._in_codomain = _membership_test(self._codomain)
+        self._tracker: Optional[_PropertyTracker] = None
+        if tracked:
+            self._tracker = _PropertyTracker(self._relation, self._tracked_domain())
 
     @classmethod
     def from_function(
         cls,
         domain: Set[Any] | Callable[[Any], bool],
         func: Callable[[Any], Any],
+        codomain: Optional[Set[Any] | Callable[[Any], bool]] = None,
+        batch: Optional[Callable[[list[Any]], Iterable[Any]]] = None,
+        cache_size: int = 4096,
+        chunk_size: int = 1024,
+    ) -> Self:
+        # func is memoized in a bounded LRU; batch, when given, maps a list of
+        # domain elements to their images and is used whenever pairs are listed
+        relation = cls(domain=domain, codomain=codomain, from_func=True, func=func)
+        relation._relation = _FunctionPairs(
+            relation.domain, func, batch, cache_size, chunk_size
+        )
+        return relation
+
+    @classmethod
+    def from_predicate(
+        cls,
+        predicate: Callable[[Any, Any], bool],
+        domain: Set[Any] | Callable[[Any], bool],
+        codomain: Optional[Set[Any] | Callable[[Any], bool]] = None,
+    ) -> Self:
+        # A predicate relation without an explicit codomain is homogeneous
+        if codomain is None:
+            codomain = domain
+        relation = cls(domain=domain, codomain=codomain)
+        relation._relation = _PredicatePairs(
+            predicate, relation.domain, relation.codomain
+        )
+        return relation
+
+    @classmethod
+    def from_hasse(
+        cls,
+        edges: Iterable[tuple[Any, Any]],
+        domain: Set[Any],
+        reflexive: bool = False,
+    ) -> Self:
+        # The order generated by covering edges, e.g. from hasse_edges(). Only
+        # the edges are kept; comparisons are answered by reachability and
+        # memoized per element, so the full order is never built up front.
+        relation = cls(domain=domain, codomain=domain)
+        relation._relation = _ClosurePairs(edges, relation.domain, reflexive)
+        return relation
+
+    @classmethod
+    def from_grid(
+        cls,
+        n: int,
+        predicate: Callable[[Any, Any], Any],
+        m: Optional[int] = None,
+        tracked: bool = False,
+        symbolic: bool = False,
+    ) -> Self:
+        # Dense relation over range(n) x range(m). With symbolic=True the
+        # predicate is called once per row with a symbolic column for b, so
+        # comparisons, offsets and residues build each bit row in a handful of
+        # integer operations; the caller vouches that the predicate only uses
+        # those. Otherwise every cell is evaluated.
+        m = n if m is None else m
+        rows = Interner(range(n))
+        columns = rows if m == n else Interner(range(m))
+        relation = cls(domain=set(range(n)), codomain=set(range(m)), dense=True)
+        relation._relation = BitMatrix.from_rows(
+            rows,
+            columns,
+            [grid.row_mask(predicate, a, m, symbolic) for a in range(n)],
+        )
+        if tracked:
+            relation._tracker = _PropertyTracker(
+                relation._relation, relation._tracked_domain()
+            )
+        return relation
+
+    @classmethod
+    def from_columns(
+        cls,
+        left: Sequence[Any],
+        right: Sequence[Any],
+        domain: Set[Any] | Callable[[Any], bool],
+        codomain: Optional[Set[Any] | Callable[[Any], bool]] = None,
+        chunk_size: int = 65536,
+        dense: bool = False,
     ) -> Self:
-        return cls(domain=domain, from_func=True, func=func)
+        if len(left) != len(right):
+            raise ValueError("Columns must have the same length")
+        relation = cls(domain=domain, codomain=codomain, dense=dense)
+        for start in range(0, len(left), chunk_size):
+            stop = start + chunk_size
+            relation._add_columns(left[start:stop], right[start:stop])
+        return relation
+
+    @classmethod
+    def from_csv(
+        cls,
+        path: str | os.PathLike,
+        domain: Set[Any] | Callable[[Any], bool],
+        codomain: Optional[Set[Any] | Callable[[Any], bool]] = None,
+        delimiter: str = ",",
+        columns: tuple[int | str, int | str] = (0, 1),
+        header: bool = False,
+        converters: tuple[Callable[[str], Any], Callable[[str], Any]] = (str, str),
+        chunk_size: int = 65536,
+        dense: bool = False,
+    ) -> Self:
+        relation = cls(domain=domain, codomain=codomain, dense=dense)
+        left_convert, right_convert = converters
+        with open(path, newline="") as csv_file:
+            reader = csv.reader(csv_file, delimiter=delimiter)
+            names = next(reader, []) if header else []
+            try:
+                i, j = (
+                    names.index(column) if isinstance(column, str) else column
+                    for column in columns
+                )
+            except ValueError:
+                raise ValueError(
+                    f"Columns {columns} not found in header {names}"
+                ) from None
+            while True:
+                lefts: list[Any] = []
+                rights: list[Any] = []
+                rows = 0
+                for row in itertools.islice(reader, chunk_size):
+                    rows += 1
+                    if row:
+                        lefts.append(left_convert(row[i]))
+                        rights.append(right_convert(row[j]))
+                if not rows:
+                    break
+                relation._add_columns(lefts, rights)
+        return relation
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, mmap: bool = True) -> Self:
+        pairs, domain, codomain, dense = serialization.load(path, mmap=mmap)
+        if dense and not mmap:
+            return cls(domain=domain, codomain=codomain, relation=pairs, dense=True)
+        return cls._from_storage(domain, codomain, pairs)
+
+    def save(self, path: str | os.PathLike) -> None:
+        if self._from_func:
+            raise ValueError("Operation not implemented for function-based relations")
+        serialization.save(
+            path, self._relation, self.domain, self.codomain, dense=self._dense
+        )
 
     @property
     def domain(self) -> Set[Any] | Callable[[Any], bool]:
@@ -44,169 +875,270 @@ class BinaryRelation:
         return self._codomain
 
     @property
-    def relation(self) -> Set[tuple[Any, Any]]:
-        return self._relation
+    def relation(self) -> RelationView:
+        return RelationView(self)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def tracked(self) -> bool:
+        return self._tracker is not None
+
+    @property
+    def dense(self) -> bool:
+        return self._dense
+
+    @property
+    def backend(self) -> str:
+        # A view reports the backend it is materialized into on first write
+        return self._storage_options().get("backend", backends.name_of(self._relation))
+
+    @property
+    def capabilities(self) -> frozenset[str]:
+        return backends.capabilities(self._relation)
+
+    @property
+    def universe(self) -> Optional[backends.Universe]:
+        return getattr(self._relation, "universe", None)
+
+    @property
+    def _dense(self) -> bool:
+        # Matrix algorithms apply whenever the storage holds bit rows
+        return "bitset" in backends.capabilities(self._relation)
 
     def elements(self) -> tuple[Any, Any] | Generator:
-        if self._from_func:
-            if callable(self.domain):
-                raise ValueError(
-                    "Operation not implemented for function-based domains."
-                )
-            for x in self.domain:
-                yield (x, self._func(x))
-        else:
-            if self.relation is not None:
-                for pair in self.relation:
-                    yield pair
+        for pair in self._relation:
+            yield pair
 
     def add_pair(self, pair: tuple[Any, Any]) -> None:
         a, b = pair
-        # Case 1: Domain is a function; codomain is not
-        if callable(self.domain) and not callable(self.codomain):
-            if not self.domain(a):
-                raise ValueError(f"{a} is not in domain")
-            if b not in self.codomain:
-                raise ValueError(f"{b} is not in codomain")
-        # Case 2: Domain and codomain are functions
-        elif callable(self.domain) and callable(self.codomain):
-            if not self.domain(a):
-                raise ValueError(f"{a} not in domain")
-            if not self.codomain(b):
-                raise ValueError(f"{b} not in codomain")
-        # Case 3: Codomain is a function; domain is not
-        elif not callable(self.domain) and callable(self.codomain):
-            if a not in self.domain:
-                raise ValueError(f"{a} not in domain")
-            if not self.codomain(b):
-                raise ValueError(f"{b} not in codomain")
-        # Case 4: Neither domain nor codomain are functions
-        else:
-            assert isinstance(self.domain, set)
-            if a not in self.domain:
-                raise ValueError(f"{a} not in domain")
-            assert isinstance(self.codomain, set)
-            if b not in self.codomain:
-                raise ValueError(f"{b} not in codomain")
-        self.relation.add((a, b))
+        if not self._in_domain(a):
+            raise ValueError(f"{a} not in domain")
+        if not self._in_codomain(b):
+            raise ValueError(f"{b} not in codomain")
+        if (a, b) in self._relation:
+            return
+        self._ensure_writable()
+        if self._tracker is not None:
+            self._tracker.add(self._relation, a, b)
+        self._relation.add((a, b))
+        if self._index is not None:
+            self._index.add(a, b)
+        self._invalidate()
+
+    def add_pairs(self, pairs: Iterable[tuple[Any, Any]]) -> None:
+        in_domain = self._in_domain
+        in_codomain = self._in_codomain
+
+        def validated() -> Iterator[tuple[Any, Any]]:
+            for pair in pairs:
+                a, b = pair
+                if not in_domain(a):
+                    raise ValueError(f"{a} not in domain")
+                if not in_codomain(b):
+                    raise ValueError(f"{b} not in codomain")
+                yield pair
+
+        self._insert(validated())
 
     def remove_pair(self, pair: tuple[Any, Any]) -> None:
-        if pair not in self.relation:
+        if pair not in self._relation:
             raise KeyError
-        self.relation.remove(pair)
+        self._ensure_writable()
+        if self._tracker is not None:
+            self._tracker.discard(self._relation, *pair)
+        self._relation.remove(pair)
+        if self._index is not None:
+            self._index.discard(*pair)
+        self._invalidate()
 
-    def is_reflexive(self) -> bool:
-        if callable(self.domain):
-            raise ValueError("Operation not implemented for function-based domains.")
-        for elem in self.domain:
-            if (elem, elem) not in self.relation:
-                return False
-        return True
+    @_cached
+    def is_reflexive(self, explain: bool = False) -> Verdict:
+        if self._tracker is not None and not explain:
+            domain = self._tracker.domain or self._finite_domain()
+            return self._tracker.diagonal == len(domain)
+        if self._dense and not explain:
+            self._finite_domain()
+            return self._relation.is_reflexive(self.domain)
+        return self._verdict(self._scan(reflexive=True), explain)
 
-    def is_symmetric(self) -> bool:
-        for a, b in self.relation:
-            if (b, a) not in self.relation:
-                return False
-        return True
+    @_cached
+    def is_symmetric(self, explain: bool = False) -> Verdict:
+        if self._tracker is not None and not explain:
+            return self._tracker.unmatched == 0
+        if self._homogeneous_matrix() and not explain:
+            return self._relation.is_symmetric()
+        return self._verdict(self._scan(symmetric=True), explain)
 
-    def is_transitive(self) -> bool:
-        for a, b in self.relation:
-            for c, d in self.relation:
-                if b == c:
-                    if (a, d) not in self.relation:
-                        return False
-        return True
+    @_cached
+    def is_transitive(
+        self, explain: bool = False, workers: Optional[int] = None
+    ) -> Verdict:
+        if workers is not None and workers > 1:
+            forward = self._adjacency().forward
+            witness = parallel.first_result(
+                parallel.transitive_rows, {"forward": forward}, forward, workers
+            )
+            if witness is not None:
+                a, b, c = witness
+                witness = Counterexample("transitive", ((a, b), (b, c)))
+            return self._verdict(witness, explain)
+        if self._homogeneous_matrix() and not explain:
+            return self._relation.is_transitive()
+        return self._verdict(self._scan(transitive=True), explain)
 
-    def is_irreflexive(self) -> bool:
-        if callable(self.domain):
-            raise ValueError("Operation not implemented for function-based domains.")
-        for elem in self.domain:
-            if (elem, elem) in self.relation:
-                return False
-        return True
+    @_cached
+    def is_irreflexive(self, explain: bool = False) -> Verdict:
+        if self._tracker is not None and not explain:
+            self._finite_domain()
+            return self._tracker.diagonal == 0
+        if self._dense and not explain:
+            self._finite_domain()
+            return self._relation.is_irreflexive(self.domain)
+        return self._verdict(self._scan(irreflexive=True), explain)
 
-    def is_antisymmetric(self) -> bool:
-        for a, b in self.relation:
-            if (b, a) in self.relation and a != b:
-                return False
-        return True
+    @_cached
+    def is_antisymmetric(self, explain: bool = False) -> Verdict:
+        if self._tracker is not None and not explain:
+            return self._tracker.mutual == 0
+        if self._homogeneous_matrix() and not explain:
+            return self._relation.is_antisymmetric()
+        return self._verdict(self._scan(antisymmetric=True), explain)
 
-    def is_asymmetric(self) -> bool:
-        for a, b in self.relation:
-            if (b, a) in self.relation:
-                return False
-        return True
+    @_cached
+    def is_asymmetric(self, explain: bool = False) -> Verdict:
+        if self._tracker is not None and not explain:
+            return self._tracker.mutual == 0 and self._tracker.loops == 0
+        if self._homogeneous_matrix() and not explain:
+            return self._relation.is_asymmetric()
+        return self._verdict(self._scan(asymmetric=True), explain)
 
-    def is_connected(self) -> bool:
+    @_cached
+    def is_connected(self, workers: Optional[int] = None) -> bool:
         if callable(self.domain):
             raise ValueError("Operation not implemented for function-based domains")
-        for a, b in itertools.product(self.domain, self.domain):
-            if a != b:
-                if (a, b) not in self.relation and (b, a) not in self.relation:
-                    return False
-        return True
+        return self._connected(strong=False, workers=workers)
 
-    def is_strongly_connected(self) -> bool:
+    @_cached
+    def is_strongly_connected(self, workers: Optional[int] = None) -> bool:
         if callable(self.domain):
             raise ValueError("Operation not implemented for function-based domains")
-        for a, b in itertools.product(self.domain, self.domain):
-            if (a, b) not in self.relation and (b, a) not in self.relation:
-                return False
-        return True
+        return self._connected(strong=True, workers=workers)
 
-    def is_well_founded(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_well_founded(self, explain: bool = False) -> Verdict:
+        # Over a finite domain an infinite descending chain must revisit an
+        # element, so well-founded is the same as having no cycle
+        self._finite_domain()
+        cycle = self.find_cycle()
+        counterexample = None
+        if cycle is not None:
+            steps = tuple(zip(cycle, cycle[1:] + cycle[:1]))
+            counterexample = Counterexample("well_founded", steps)
+        return self._verdict(counterexample, explain)
 
-    def is_injective(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_injective(self, explain: bool = False) -> Verdict:
+        return self._verdict(self._scan_mapping(injective=True), explain)
 
-    def is_functional(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_functional(self, explain: bool = False) -> Verdict:
+        return self._verdict(self._scan_mapping(functional=True), explain)
 
-    def is_serial(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_serial(self, explain: bool = False) -> Verdict:
+        return self._verdict(self._scan_mapping(serial=True), explain)
 
-    def is_surjective(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_surjective(self, explain: bool = False) -> Verdict:
+        return self._verdict(self._scan_mapping(surjective=True), explain)
 
-    def is_equivalence_relation(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_equivalence_relation(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan(reflexive=True, symmetric=True, transitive=True)
+        return self._verdict(counterexample, explain)
 
-    def is_partial_order(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_partial_order(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan(reflexive=True, antisymmetric=True, transitive=True)
+        return self._verdict(counterexample, explain)
 
-    def is_strict_partial_order(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_strict_partial_order(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan(irreflexive=True, asymmetric=True, transitive=True)
+        return self._verdict(counterexample, explain)
 
-    def is_total_order(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_total_order(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan(
+            reflexive=True, antisymmetric=True, transitive=True, connected=True
+        )
+        return self._verdict(counterexample, explain)
 
-    def is_strict_total_order(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_strict_total_order(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan(
+            irreflexive=True, asymmetric=True, transitive=True, connected=True
+        )
+        return self._verdict(counterexample, explain)
 
-    def is_one_to_one(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_one_to_one(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(functional=True, injective=True)
+        return self._verdict(counterexample, explain)
 
-    def is_one_to_many(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_one_to_many(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(injective=True)
+        if counterexample is None:
+            functional = self._scan_mapping(functional=True)
+            counterexample = self._expect_violation(functional, "functional")
+        return self._verdict(counterexample, explain)
 
-    def is_many_to_one(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_many_to_one(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(functional=True)
+        if counterexample is None:
+            injective = self._scan_mapping(injective=True)
+            counterexample = self._expect_violation(injective, "injective")
+        return self._verdict(counterexample, explain)
 
-    def is_many_to_many(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_many_to_many(self, explain: bool = False) -> Verdict:
+        functional = self._scan_mapping(functional=True)
+        counterexample = self._expect_violation(functional, "functional")
+        if counterexample is None:
+            injective = self._scan_mapping(injective=True)
+            counterexample = self._expect_violation(injective, "injective")
+        return self._verdict(counterexample, explain)
 
-    def is_function(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_function(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(functional=True, serial=True)
+        return self._verdict(counterexample, explain)
 
-    def is_injection(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_injection(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(
+            functional=True, serial=True, injective=True
+        )
+        return self._verdict(counterexample, explain)
 
-    def is_surjection(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_surjection(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(
+            functional=True, serial=True, surjective=True
+        )
+        return self._verdict(counterexample, explain)
 
-    def is_bijection(self) -> bool:
-        raise NotImplementedError
+    @_cached
+    def is_bijection(self, explain: bool = False) -> Verdict:
+        counterexample = self._scan_mapping(
+            functional=True, serial=True, injective=True, surjective=True
+        )
+        return self._verdict(counterexample, explain)
 
     def update(self, other_relation: Self) -> Self:
         if self._unimplemented_operation(other_relation):
@@ -219,116 +1151,495 @@ class BinaryRelation:
             self.domain.update(other_relation.domain)
         if isinstance(other_relation.codomain, set):
             self.codomain.update(other_relation.codomain)
-        self.relation.update(other_relation.relation)
+        new_pairs = other_relation._relation - self._relation
+        self._ensure_writable()
+        if self._dense:
+            self._relation.reserve(self.domain, self.codomain)
+        if self._tracker is not None:
+            self._tracker.reset_domain(self._relation, self._tracked_domain())
+            for a, b in new_pairs:
+                self._tracker.add(self._relation, a, b)
+                self._relation.add((a, b))
+        elif self._dense:
+            self._relation |= new_pairs
+        else:
+            self._relation.update(new_pairs)
+        if self._index is not None:
+            self._index.update(new_pairs)
+        self._invalidate()
         return self
 
     def union(self, other_relation: Self) -> Self:
-        if self._unimplemented_operation(other_relation):
-            raise ValueError(
-                "Operation not implemented for function-based domains and codomains"
-            )
         result_domain = self._merge_domains(other_relation)
         result_codomain = self._merge_codomains(other_relation)
-        result_relation = self.relation.copy()
-        result_relation.update(other_relation.relation)
-        return self.__class__(
-            domain=result_domain, codomain=result_codomain, relation=result_relation
+        return self._combine(
+            other_relation, result_domain, result_codomain, operator.or_
         )
 
     def intersection(self, other_relation: Self) -> Self:
-        if self._unimplemented_operation(other_relation):
-            raise ValueError(
-                "Operation not implemented for function-based domains and codomains"
-            )
         result_domain = self._merge_domains(other_relation)
         result_codomain = self._merge_codomains(other_relation)
-        result_relation = self.relation
-        result_relation &= other_relation.relation
-        return self.__class__(
-            domain=result_domain, codomain=result_codomain, relation=result_relation
+        return self._combine(
+            other_relation, result_domain, result_codomain, operator.and_
         )
 
     def difference(self, other_relation: Self) -> Self:
-        if self._unimplemented_operation(other_relation):
-            raise ValueError(
-                "Operation not implemented for function-based domains and codomains"
-            )
         result_domain = self._merge_domains(other_relation)
         result_codomain = self._merge_codomains(other_relation)
-        result_relation = self.relation
-        result_relation -= other_relation.relation
-        return self.__class__(
-            domain=result_domain, codomain=result_codomain, relation=result_relation
+        return self._combine(
+            other_relation, result_domain, result_codomain, operator.sub
         )
 
     def symmetric_difference(self, other_relation: Self) -> Self:
-        if self._unimplemented_operation(other_relation):
-            raise ValueError(
-                "Operation not implemented for function-based domains and codomains"
-            )
         result_domain = self._merge_domains(other_relation)
         result_codomain = self._merge_codomains(other_relation)
-        result_relation = self.relation
-        result_relation ^= other_relation.relation
-        return self.__class__(
-            domain=result_domain, codomain=result_codomain, relation=result_relation
+        return self._combine(
+            other_relation, result_domain, result_codomain, operator.xor
         )
 
-    def compose(self, other_relation: Self) -> Self:
-        if self._unimplemented_operation(other_relation):
-            raise ValueError(
-                "Operation not implemented for function-based domains and codomains"
-            )
-        if self.codomain != other_relation.domain:
-            raise ValueError(
-                "First relation's codomain must be equal to the second relation's \
-                    domain"
+    def intersection_update(self, other_relation: Self) -> Self:
+        return self._update_in_place(other_relation, operator.iand)
+
+    def difference_update(self, other_relation: Self) -> Self:
+        return self._update_in_place(other_relation, operator.isub)
+
+    def symmetric_difference_update(self, other_relation: Self) -> Self:
+        return self._update_in_place(other_relation, operator.ixor)
+
+    def compose(self, other_relation: Self, workers: Optional[int] = None) -> Self:
+        if self._from_func and other_relation._from_func:
+            # Composing two functions stays a function: x maps to g(f(x)) where
+            # f(x) lies in the domain of g, and nothing is materialized
+            first = self._relation
+            second = other_relation._relation
+            in_domain = other_relation._in_domain
+
+            def composed(x: Any) -> Any:
+                y = first.image(x)
+                if y is _UNDEFINED or not in_domain(y):
+                    return _UNDEFINED
+                return second.image(y)
+
+            return self.from_function(
+                domain=_copy_members(self.domain),
+                func=composed,
+                codomain=_copy_members(other_relation.codomain),
             )
-        result_relation = set()
-        for a, b in self.relation:
-            for c, d in other_relation.relation:
-                if b == c:
-                    result_relation.add((a, d))
+        self._check_composable(other_relation)
+        result_relation = None
+        if self._dense and other_relation._dense:
+            result_relation = self._relation.compose(other_relation._relation)
+        if result_relation is None and workers is not None and workers > 1:
+            forward = self._adjacency().forward
+            state = {
+                "forward": forward,
+                "other_forward": other_relation._adjacency().forward,
+            }
+            result_relation = set()
+            for pairs in parallel.gather(
+                parallel.compose_rows, state, forward, workers
+            ):
+                result_relation |= pairs
+        if result_relation is None and self._from_func:
+            # Each x has a single image, so probe other's index with it directly
+            successors = other_relation._adjacency().forward
+            result_relation = {
+                (a, c) for a, b in self._relation for c in successors.get(b, ())
+            }
+        if result_relation is None:
+            # Join on the middle element: every b with both a predecessor in self
+            # and a successor in other contributes preds(b) x succs(b).
+            result_relation = set()
+            successors = other_relation._adjacency().forward
+            for b, predecessors in self._adjacency().reverse.items():
+                next_successors = successors.get(b)
+                if next_successors is not None:
+                    result_relation.update(
+                        itertools.product(predecessors, next_successors)
+                    )
         assert isinstance(self.domain, set)
         assert isinstance(other_relation.codomain, set)
         return self.__class__(
             domain=self.domain.copy(),
             codomain=other_relation.codomain.copy(),
             relation=result_relation,
+            **self._storage_options(),
         )
 
+    def compose_iter(
+        self,
+        other_relation: Self,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str | os.PathLike] = None,
+    ) -> Iterator[tuple[Any, Any]]:
+        # Yields the pairs of compose() without building the result. Within
+        # memory_budget pairs the join runs one row of self at a time; larger
+        # inputs are joined through partitions spilled under spill_dir.
+        self._check_composable(other_relation)
+        size = len(self._relation) + len(other_relation._relation)
+        if memory_budget is not None and size > memory_budget:
+            partitions = -(-size // max(memory_budget, 1))
+            yield from spill.hash_join(
+                self._relation,
+                other_relation._relation,
+                partitions,
+                spill_dir,
+                memory_budget,
+            )
+            return
+        successors = other_relation._adjacency().forward
+        for a, middle in self._adjacency().forward.items():
+            targets: set[Any] = set()
+            for b in middle:
+                targets.update(successors.get(b, _EMPTY))
+            for c in targets:
+                yield (a, c)
+
+    def compose_to_csv(
+        self,
+        other_relation: Self,
+        path: str | os.PathLike,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str | os.PathLike] = None,
+        delimiter: str = ",",
+    ) -> int:
+        # Writes the composition as rows readable by from_csv, returning the
+        # number of pairs written
+        count = 0
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            for pair in self.compose_iter(other_relation, memory_budget, spill_dir):
+                writer.writerow(pair)
+                count += 1
+        return count
+
+    @_cached
     def inverse(self) -> Self:
-        result_relation = set()
-        for a, b in self.relation:
-            result_relation.add((b, a))
+        if self._from_func or self._symbolic():
+            # Membership in the inverse is a lookup in this relation; pairs are
+            # only listed if the result is iterated
+            storage = _SwappedPairs(self._relation)
+            self._share(storage)
+            return self._from_storage(
+                _copy_members(self.domain), _copy_members(self.codomain), storage
+            )
+        if self._dense:
+            result_relation = self._relation.transpose()
+        else:
+            result_relation = set()
+            for a, b in self._relation:
+                result_relation.add((b, a))
         return self.__class__(
             domain=self.domain if callable(self.domain) else self.domain.copy(),
             codomain=self.codomain if callable(self.codomain) else self.codomain.copy(),
             relation=result_relation,
+            **self._storage_options(),
         )
 
+    @_cached
     def complement(self) -> Self:
-        if isinstance(self.domain, set) and isinstance(self.codomain, set):
-            result_relation = set(itertools.product(self.domain, self.codomain))
+        if self._symbolic():
+            pairs = self._relation
+            storage = _PredicatePairs(
+                lambda a, b: (a, b) not in pairs, self.domain, self.codomain
+            )
+            self._share(storage)
+            return self._from_storage(
+                _copy_members(self.domain), _copy_members(self.codomain), storage
+            )
+        if not (isinstance(self.domain, set) and isinstance(self.codomain, set)):
+            raise ValueError(
+                "Operation not implemented for function-based domains and codomains"
+            )
+        if self._dense:
+            result_relation = self._relation.complement(self.domain, self.codomain)
         else:
+            result_relation = set(itertools.product(self.domain, self.codomain))
+            result_relation -= self._relation
+        return self.__class__(
+            domain=self.domain.copy(),
+            codomain=self.codomain.copy(),
+            relation=result_relation,
+            **self._storage_options(),
+        )
+
+    def to_backend(
+        self, backend: str, universe: Optional[backends.Universe] = None
+    ) -> Self:
+        if self._from_func or self._symbolic():
             raise ValueError(
                 "Operation not implemented for function-based domains and codomains"
             )
-        result_relation -= self._relation
         return self.__class__(
             domain=self.domain.copy(),
             codomain=self.codomain.copy(),
+            relation=self._relation,
+            tracked=self.tracked,
+            backend=backend,
+            universe=universe,
+        )
+
+    def strongly_connected_components(self) -> list[set[Any]]:
+        # Components come out sinks first, as in graph.strongly_connected_components
+        successors = self._adjacency().successors
+        return [
+            set(component)
+            for component in graph.strongly_connected_components(
+                self._graph_nodes(), successors
+            )
+        ]
+
+    def topological_order(self) -> list[Any]:
+        order = graph.topological_order(
+            self._graph_nodes(), self._adjacency().successors
+        )
+        if order is None:
+            raise ValueError("Relation has a cycle")
+        return order
+
+    def reachable_from(self, x: Any) -> Iterator[Any]:
+        return graph.reachable(x, self._adjacency().successors)
+
+    def find_cycle(self) -> Optional[list[Any]]:
+        index = self._adjacency()
+        return graph.find_cycle(index.forward, index.successors)
+
+    def has_cycle(self) -> bool:
+        return self.find_cycle() is not None
+
+    @_cached
+    def transitive_reduction(self) -> Self:
+        # The least relation with the same transitive closure: the covering
+        # pairs plus any loops, so a partial order keeps its reflexive pairs
+        index = self._adjacency()
+        loops = [(a, a) for a, successors in index.forward.items() if a in successors]
+        return self.__class__(
+            domain=self.domain if callable(self.domain) else self.domain.copy(),
+            codomain=self.codomain if callable(self.codomain) else self.codomain.copy(),
+            relation=itertools.chain(self.hasse_edges(), loops),
+            **self._storage_options(),
+        )
+
+    def hasse_edges(self) -> Iterator[tuple[Any, Any]]:
+        for a, covers in self._hasse().items():
+            for b in covers:
+                yield (a, b)
+
+    def covers(self, x: Any) -> Iterator[Any]:
+        # Elements directly above x, with nothing strictly in between
+        return iter(self._hasse().get(x, ()))
+
+    def minimal_elements(self) -> list[Any]:
+        # Nothing but x itself relates to x; no reduction needed
+        reverse = self._adjacency().reverse
+        return [x for x in self._graph_nodes() if not reverse.get(x, _EMPTY) - {x}]
+
+    def maximal_elements(self) -> list[Any]:
+        forward = self._adjacency().forward
+        return [x for x in self._graph_nodes() if not forward.get(x, _EMPTY) - {x}]
+
+    def lazy(self) -> LazyRelation:
+        return Source(self)
+
+    @_cached
+    def transitive_closure(self) -> Self:
+        if self._homogeneous_matrix():
+            result_relation = self._relation.transitive_closure()
+        else:
+            index = self._adjacency()
+            result_relation = set(
+                graph.transitive_closure(index.forward, index.successors)
+            )
+        return self.__class__(
+            domain=self.domain if callable(self.domain) else self.domain.copy(),
+            codomain=self.codomain if callable(self.codomain) else self.codomain.copy(),
             relation=result_relation,
+            **self._storage_options(),
+        )
+
+    @_cached
+    def reflexive_closure(self) -> Self:
+        if callable(self.domain):
+            raise ValueError("Operation not implemented for function-based domains.")
+        result_relation = self._relation.copy()
+        for elem in self.domain:
+            result_relation.add((elem, elem))
+        return self.__class__(
+            domain=self.domain.copy(),
+            codomain=self.codomain if callable(self.codomain) else self.codomain.copy(),
+            relation=result_relation,
+            **self._storage_options(),
+        )
+
+    @_cached
+    def symmetric_closure(self) -> Self:
+        return self.union(self.inverse())
+
+    @_cached
+    def equivalence_closure(self) -> Self:
+        # Every class of the generated partition becomes a complete block
+        classes = self._partition()[1].values()
+        return self.__class__(
+            domain=self.domain.copy(),
+            codomain=_copy_members(self.codomain),
+            relation=(
+                pair
+                for members in classes
+                for pair in itertools.product(members, members)
+            ),
+            **self._storage_options(),
         )
 
+    def equivalence_classes(self) -> list[frozenset[Any]]:
+        # Classes of the equivalence this relation generates; for an
+        # equivalence relation these are exactly its own classes
+        return list(self._partition()[1].values())
+
+    def class_of(self, x: Any) -> frozenset[Any]:
+        disjoint, classes = self._partition()
+        if x not in disjoint.parent:
+            raise ValueError(f"{x} not in domain")
+        return classes[disjoint.find(x)]
+
+    def quotient(self, relation: Optional[Self] = None) -> Self:
+        # relation (this one by default) mapped onto the classes: ([a], [b])
+        # for every (a, b), over the set of classes as domain and codomain
+        relation = self if relation is None else relation
+        disjoint, classes = self._partition()
+        find = disjoint.find
+        blocks = set(classes.values())
+        try:
+            pairs = {
+                (classes[find(a)], classes[find(b)]) for a, b in relation.elements()
+            }
+        except KeyError as error:
+            raise ValueError(f"{error.args[0]} not in domain") from None
+        return self.__class__(domain=blocks, codomain=blocks.copy(), relation=pairs)
+
+    def image(self, a: Any) -> set[Any]:
+        # Every b with (a, b) in the relation, without scanning other pairs
+        if self._from_func:
+            # One (memoized) call, whatever the codomain
+            if not self._in_domain(a):
+                return set()
+            b = self._relation.image(a)
+            return set() if b is _UNDEFINED else {b}
+        if self._computed():
+            return {b for b in self._finite_codomain() if (a, b) in self._relation}
+        return set(self._successors()(a))
+
+    def preimage(self, b: Any) -> set[Any]:
+        if self._computed():
+            return {a for a in self._finite_domain() if (a, b) in self._relation}
+        return set(self._adjacency().predecessors(b))
+
+    def image_of_set(self, elements: Iterable[Any]) -> set[Any]:
+        if self._computed():
+            return set().union(*map(self.image, elements))
+        successors = self._successors()
+        result: set[Any] = set()
+        for a in elements:
+            result.update(successors(a))
+        return result
+
+    def pairs_between(
+        self, lo: Any, hi: Any, inclusive: bool = False
+    ) -> Iterator[tuple[Any, Any]]:
+        # Pairs (a, b) with lo <= a < hi, or lo <= a <= hi when inclusive,
+        # in order of a. Ordered storage answers from its own sorted pairs;
+        # anything else from sorted row keys kept beside the adjacency index.
+        if "ordered" in backends.capabilities(self._relation):
+            return self._relation.between(lo, hi, inclusive)
+        index = self._adjacency()
+        forward = index.forward
+        rows = index.rows_between(lo, hi, inclusive)
+        return ((a, b) for a in rows for b in forward.get(a, _EMPTY))
+
     def converse(self) -> Self:
         raise NotImplementedError
 
-    def restriction(self) -> Self:
-        raise NotImplementedError
+    def restriction(
+        self,
+        domain: Optional[Set[Any] | Callable[[Any], bool]] = None,
+        codomain: Optional[Set[Any] | Callable[[Any], bool]] = None,
+    ) -> Self:
+        result_domain = _meet_members(self.domain, domain)
+        result_codomain = _meet_members(self.codomain, codomain)
+        if self._from_func:
+            accept = None if codomain is None else _membership_test(codomain)
+            result = self.__class__(
+                domain=result_domain,
+                codomain=result_codomain,
+                from_func=True,
+                func=self._func,
+            )
+            result._relation = self._relation.restrict(result_domain, accept)
+            return result
+        in_domain = _membership_test(result_domain)
+        in_codomain = _membership_test(result_codomain)
+        pairs: Iterable[tuple[Any, Any]]
+        if not self._computed() and isinstance(domain, AbstractSet):
+            # A slice of the index: only the kept rows are visited, driven by
+            # whichever of the requested elements and the stored rows is fewer
+            forward = self._adjacency().forward
+            rows = domain if len(domain) < len(forward) else forward
+            pairs = (
+                (a, b)
+                for a in rows
+                if in_domain(a)
+                for b in forward.get(a, _EMPTY)
+                if in_codomain(b)
+            )
+        elif not self._computed() and isinstance(codomain, AbstractSet):
+            reverse = self._adjacency().reverse
+            columns = codomain if len(codomain) < len(reverse) else reverse
+            pairs = (
+                (a, b)
+                for b in columns
+                if in_codomain(b)
+                for a in reverse.get(b, _EMPTY)
+                if in_domain(a)
+            )
+        else:
+            pairs = (
+                (a, b) for a, b in self._relation if in_domain(a) and in_codomain(b)
+            )
+        return self.__class__(
+            domain=result_domain,
+            codomain=result_codomain,
+            relation=pairs,
+            **self._storage_options(),
+        )
+
+    def copy(self) -> Self:
+        if self._from_func:
+            # Function pairs are read-only, so the copy keeps the memoized images
+            result = self.__class__.from_function(
+                domain=self.domain, func=self._func, codomain=self.codomain
+            )
+            result._relation = self._relation
+            self._share(result)
+            result._share(self)
+            return result
+        # The copy shares this relation's storage until either side mutates
+        result = self._from_storage(
+            self.domain if callable(self.domain) else self.domain.copy(),
+            self.codomain if callable(self.codomain) else self.codomain.copy(),
+            self._relation,
+        )
+        self._share(result)
+        result._share(self)
+        if self._tracker is not None:
+            result._tracker = copy.copy(self._tracker)
+            result._tracker.domain = result._tracked_domain()
+        return result
 
     def isdisjoint(self, other_relation: Self) -> bool:
-        return len(self.intersection(other_relation)) == 0
+        # Probes the smaller side in the other; no intersection is built
+        small, large = self._relation, other_relation._relation
+        if not _is_finite(small) or (_is_finite(large) and len(small) > len(large)):
+            small, large = large, small
+        return not any(pair in large for pair in small)
 
     def issubset(self, other_relation: Self) -> bool:
         # TODO
@@ -339,15 +1650,6 @@ class BinaryRelation:
         return False
 
     def __contains__(self, item: tuple[Any, Any]) -> bool:
-        if self._from_func:
-            a, b = item
-            if callable(self.domain):
-                if not self.domain(a):
-                    return False
-            else:
-                if a not in self.domain:
-                    return False
-            return b == self._func(a)
         return item in self._relation
 
     def __eq__(self, other_relation: object) -> bool:
@@ -356,20 +1658,420 @@ class BinaryRelation:
         if (
             self.domain != other_relation.domain
             or self.codomain != other_relation.codomain
-            or self.relation != other_relation.relation
+            or self._relation != other_relation._relation
         ):
             return False
         return True
 
     def __repr__(self) -> str:
         return f"BinaryRelation(domain={self.domain}, codomain={self.codomain}, \
-            relation={self.relation})"
+            relation={self._relation})"
 
     def __str__(self) -> str:
-        return f"{self.relation}"
+        return f"{self._relation}"
 
     def __len__(self) -> int:
-        return len(self.relation)
+        return len(self._relation)
+
+    def _add_columns(self, lefts: Sequence[Any], rights: Sequence[Any]) -> None:
+        # Validate each distinct element of a chunk once, then insert the zip
+        for a in set(lefts):
+            if not self._in_domain(a):
+                raise ValueError(f"{a} not in domain")
+        for b in set(rights):
+            if not self._in_codomain(b):
+                raise ValueError(f"{b} not in codomain")
+        self._insert(zip(lefts, rights))
+
+    def _insert(self, pairs: Iterable[tuple[Any, Any]]) -> None:
+        self._ensure_writable()
+        try:
+            if self._dense or self._tracker is not None:
+                relation = self._relation
+                tracker = self._tracker
+                for a, b in pairs:
+                    if (a, b) not in relation:
+                        if tracker is not None:
+                            tracker.add(relation, a, b)
+                        relation.add((a, b))
+            else:
+                self._relation.update(pairs)
+        finally:
+            # Pairs inserted before a validation error stay in the relation
+            self._index = None
+            self._invalidate()
+
+    @classmethod
+    def _from_storage(
+        cls,
+        domain: Set[Any] | Callable[[Any], bool],
+        codomain: Set[Any] | Callable[[Any], bool],
+        storage: Set[tuple[Any, Any]],
+    ) -> Self:
+        relation = cls(domain=domain, codomain=codomain)
+        relation._relation = storage
+        return relation
+
+    def _combine(
+        self,
+        other_relation: Self,
+        domain: Set[Any],
+        codomain: Set[Any],
+        operation: Callable[[Any, Any], Any],
+    ) -> Self:
+        if self._dense and _is_finite(other_relation._relation):
+            return self.__class__(
+                domain=domain,
+                codomain=codomain,
+                relation=operation(self._relation, other_relation._relation),
+                dense=True,
+            )
+        if "algebra" in backends.capabilities(self._relation) and _is_finite(
+            other_relation._relation
+        ):
+            # Storages with native set operations build the result directly
+            result = operation(self._relation, other_relation._relation)
+            return self._from_storage(domain, codomain, result)
+        # Predicate-defined operands make the result symbolic: membership is
+        # answered through both operands and nothing is enumerated
+        storage = _SharedPairs(operation, self._relation, other_relation._relation)
+        if storage.depth > _MAX_SHARED_DEPTH and storage.finite:
+            return self.__class__(
+                domain=domain,
+                codomain=codomain,
+                relation=storage,
+                **backends.options(storage),
+            )
+        self._share(storage)
+        other_relation._share(storage)
+        return self._from_storage(domain, codomain, storage)
+
+    def _update_in_place(
+        self, other_relation: Self, operation: Callable[[Any, Any], Any]
+    ) -> Self:
+        if self._unimplemented_operation(other_relation):
+            raise ValueError(
+                "Operation not implemented for function-based domains and codomains"
+            )
+        assert isinstance(self.domain, set)
+        assert isinstance(self.codomain, set)
+        self.domain.update(other_relation.domain)
+        self.codomain.update(other_relation.codomain)
+        self._ensure_writable()
+        if self._dense:
+            self._relation.reserve(self.domain, self.codomain)
+        self._relation = operation(self._relation, other_relation._relation)
+        self._index = None
+        if self._tracker is not None:
+            self._tracker = _PropertyTracker(self._relation, self._tracked_domain())
+        self._invalidate()
+        return self
+
+    def _verdict(
+        self, counterexample: Optional[Counterexample], explain: bool
+    ) -> Verdict:
+        if explain:
+            return counterexample
+        return counterexample is None
+
+    def _expect_violation(
+        self, counterexample: Optional[Counterexample], name: str
+    ) -> Optional[Counterexample]:
+        if counterexample is None:
+            return Counterexample(f"not {name}", ())
+        return None
+
+    def _scan(
+        self,
+        reflexive: bool = False,
+        irreflexive: bool = False,
+        symmetric: bool = False,
+        antisymmetric: bool = False,
+        asymmetric: bool = False,
+        transitive: bool = False,
+        connected: bool = False,
+    ) -> Optional[Counterexample]:
+        # Checks every requested property in a single traversal of the forward
+        # index and stops at the first counterexample. The profiler installs a
+        # copy that also counts the rows and pairs visited; keep them in step.
+        index = self._adjacency()
+        forward = index.forward
+        pairwise = symmetric or antisymmetric or asymmetric or transitive
+        rows: Iterable[tuple[Any, Set[Any], bool]]
+        if reflexive or irreflexive or connected:
+            domain = self._finite_domain()
+            rows = itertools.chain(
+                ((a, forward.get(a, _EMPTY), True) for a in domain),
+                (
+                    (a, successors, False)
+                    for a, successors in forward.items()
+                    if pairwise and a not in domain
+                ),
+            )
+        else:
+            rows = ((a, successors, False) for a, successors in forward.items())
+        for a, successors, in_domain in rows:
+            if in_domain:
+                if reflexive and a not in successors:
+                    return Counterexample("reflexive", (a,))
+                if irreflexive and a in successors:
+                    return Counterexample("irreflexive", ((a, a),))
+                if connected:
+                    comparable = (successors | index.predecessors(a)) & domain
+                    if len(comparable) - (a in comparable) < len(domain) - 1:
+                        b = next(b for b in domain if b != a and b not in comparable)
+                        return Counterexample("connected", (a, b))
+            if not pairwise:
+                continue
+            for b in successors:
+                back = forward.get(b, _EMPTY)
+                if a in back:
+                    if asymmetric:
+                        return Counterexample("asymmetric", ((a, b), (b, a)))
+                    if antisymmetric and a != b:
+                        return Counterexample("antisymmetric", ((a, b), (b, a)))
+                elif symmetric:
+                    return Counterexample("symmetric", ((a, b),))
+                if transitive and not back <= successors:
+                    c = next(c for c in back if c not in successors)
+                    return Counterexample("transitive", ((a, b), (b, c)))
+        return None
+
+    def _scan_mapping(
+        self,
+        functional: bool = False,
+        injective: bool = False,
+        serial: bool = False,
+        surjective: bool = False,
+    ) -> Optional[Counterexample]:
+        index = self._adjacency()
+        if serial:
+            for a in self._finite_domain():
+                if a not in index.forward:
+                    return Counterexample("serial", (a,))
+        if surjective:
+            if callable(self.codomain):
+                raise ValueError(
+                    "Operation not implemented for function-based codomains."
+                )
+            for b in self.codomain:
+                if b not in index.reverse:
+                    return Counterexample("surjective", (b,))
+        if functional:
+            for a, successors in index.forward.items():
+                if len(successors) > 1:
+                    b, c = itertools.islice(successors, 2)
+                    return Counterexample("functional", ((a, b), (a, c)))
+        if injective:
+            for b, predecessors in index.reverse.items():
+                if len(predecessors) > 1:
+                    a, c = itertools.islice(predecessors, 2)
+                    return Counterexample("injective", ((a, b), (c, b)))
+        return None
+
+    def _finite_domain(self) -> Set[Any]:
+        if callable(self.domain):
+            raise ValueError("Operation not implemented for function-based domains.")
+        if isinstance(self.domain, (set, frozenset)):
+            return self.domain
+        return set(self.domain)
+
+    def _finite_codomain(self) -> Set[Any]:
+        if callable(self.codomain):
+            raise ValueError("Operation not implemented for function-based codomains.")
+        return self.codomain
+
+    def _computed(self) -> bool:
+        # Pairs produced by a function or predicate are probed one at a time
+        # rather than listed into an index
+        return (
+            self._from_func
+            or isinstance(self._relation, _PredicatePairs)
+            or not _is_finite(self._relation)
+        )
+
+    def _successors(self) -> Callable[[Any], Iterable[Any]]:
+        # Storage that lists a row directly is asked; otherwise the index is
+        if "successors" in backends.capabilities(self._relation):
+            return self._relation.successors
+        return self._adjacency().successors
+
+    def _tracked_domain(self) -> Optional[Set[Any]]:
+        return None if callable(self.domain) else self._finite_domain()
+
+    def _adjacency(self) -> _AdjacencyIndex:
+        # Built on first use, then maintained incrementally by the mutators
+        if self._index is None:
+            if "index" in backends.capabilities(self._relation):
+                # The storage already keeps both directions; share its dicts
+                index = _AdjacencyIndex()
+                index.forward = self._relation.forward
+                index.reverse = self._relation.reverse
+                self._index = index
+            else:
+                self._index = _AdjacencyIndex(self._relation)
+        return self._index
+
+    def _check_composable(self, other_relation: Self) -> None:
+        if self._unimplemented_operation(other_relation):
+            raise ValueError(
+                "Operation not implemented for function-based domains and codomains"
+            )
+        if self.codomain != other_relation.domain:
+            raise ValueError(
+                "First relation's codomain must be equal to the second relation's \
+                    domain"
+            )
+
+    def _connected(self, strong: bool, workers: Optional[int] = None) -> bool:
+        # Every unordered pair of distinct elements (and, when strong, every
+        # loop) needs a pair of its own, so small relations fail on size alone.
+        # Both bounds run before any worker pool is started.
+        domain = self._finite_domain()
+        n = len(domain)
+        needed = n * (n + 1) // 2 if strong else n * (n - 1) // 2
+        if len(self._relation) < needed:
+            return False
+        parallel_check = workers is not None and workers > 1
+        if self._homogeneous_matrix() and not parallel_check:
+            return self._relation.is_connected(domain, strong)
+        index = self._adjacency()
+        forward, reverse = index.forward, index.reverse
+        # Degree bound first: a row plus a column shorter than n - 1 (n when
+        # strong, the loop being counted twice) cannot cover the domain
+        least = n if strong else n - 1
+        for a in domain:
+            if len(forward.get(a, _EMPTY)) + len(reverse.get(a, _EMPTY)) < least:
+                return False
+        if parallel_check:
+            return self._parallel_connected(workers, strong)
+        for a in domain:
+            comparable = forward.get(a, _EMPTY) | reverse.get(a, _EMPTY)
+            if not strong:
+                comparable = comparable | {a}
+            if not domain <= comparable:
+                return False
+        return True
+
+    def _parallel_connected(self, workers: int, strong: bool) -> bool:
+        domain = self._finite_domain()
+        index = self._adjacency()
+        state = {
+            "forward": index.forward,
+            "reverse": index.reverse,
+            "domain": frozenset(domain),
+            "strong": strong,
+        }
+        witness = parallel.first_result(parallel.connected_rows, state, domain, workers)
+        return witness is None
+
+    @_cached
+    def _partition(self) -> tuple[graph.DisjointSet, dict[Any, frozenset[Any]]]:
+        disjoint = graph.DisjointSet(self._finite_domain())
+        for a, b in self._relation:
+            disjoint.union(a, b)
+        classes = {
+            root: frozenset(members) for root, members in disjoint.groups().items()
+        }
+        return disjoint, classes
+
+    @_cached
+    def _hasse(self) -> dict[Any, list[Any]]:
+        edges = graph.transitive_reduction(
+            self._graph_nodes(), self._adjacency().successors
+        )
+        if edges is None:
+            raise ValueError("Relation has a cycle")
+        covers: dict[Any, list[Any]] = {}
+        for a, b in edges:
+            covers.setdefault(a, []).append(b)
+        return covers
+
+    def _graph_nodes(self) -> list[Any]:
+        # Finite domain elements first, then anything else the pairs mention
+        index = self._adjacency()
+        nodes = {} if callable(self.domain) else dict.fromkeys(self.domain)
+        nodes.update(dict.fromkeys(index.forward))
+        nodes.update(dict.fromkeys(index.reverse))
+        return list(nodes)
+
+    def _ensure_writable(self) -> None:
+        # Storage still aliased by a live copy or view is copied, and read-only
+        # storage (a memory-mapped file or a shared set-operation result)
+        # becomes a set, on the first mutation. Cached results go first: the
+        # mutation invalidates them anyway, so they should not force a copy.
+        self._cache.clear()
+        storage = self._relation
+        if not isinstance(storage, MutableSet):
+            # Views materialize into the backend they were derived from
+            self._relation = self._materialize(storage)
+            if "index" in backends.capabilities(self._relation):
+                self._index = None
+            self._sharers = []
+            if self._from_func:
+                # Once edited, the pairs are no longer the graph of func
+                self._from_func = False
+                del self._func
+        elif self._storage_shared():
+            if "index" in backends.capabilities(storage):
+                self._index = None
+            self._relation = storage.copy()
+            self._sharers = []
+
+    def _materialize(self, storage: Set[tuple[Any, Any]]) -> Set[tuple[Any, Any]]:
+        options = backends.options(storage)
+        name = options.get("backend")
+        if name == "bitmatrix":
+            if callable(self.domain) or callable(self.codomain):
+                return set(storage)
+            rows = Interner(self.domain)
+            columns = rows if self.codomain == self.domain else Interner(self.codomain)
+            return BitMatrix(rows, columns, storage)
+        if name is None:
+            return set(storage)
+        return backends.create(name, storage, options.get("universe"))
+
+    def _share(self, holder: Any) -> None:
+        # holder aliases this relation's current storage
+        sharers = self._sharers
+        if len(sharers) >= _PRUNE_SHARERS:
+            sharers[:] = [ref for ref in sharers if ref() is not None]
+        sharers.append(weakref.ref(holder))
+
+    def _storage_shared(self) -> bool:
+        # A view never changes its operands; a relation only aliases this
+        # storage until it replaces its own
+        storage = self._relation
+        live = []
+        for ref in self._sharers:
+            holder = ref()
+            if holder is None:
+                continue
+            if isinstance(holder, BinaryRelation) and holder._relation is not storage:
+                continue
+            live.append(ref)
+        self._sharers = live
+        return bool(live)
+
+    def _invalidate(self) -> None:
+        self._version += 1
+        self._cache.clear()
+
+    def _symbolic(self) -> bool:
+        # Pairs defined by a predicate, or over a predicate domain or codomain
+        return (
+            isinstance(self._relation, _PredicatePairs)
+            or not _is_finite(self._relation)
+            or callable(self.domain)
+            or callable(self.codomain)
+        )
+
+    def _storage_options(self) -> dict[str, Any]:
+        # Derived relations keep this relation's backend; views default to sets
+        return backends.options(self._relation)
+
+    def _homogeneous_matrix(self) -> bool:
+        return self._dense and self._relation.homogeneous
 
     def _unimplemented_operation(self, other_relation: Optional[Self] = None) -> bool:
         if callable(self.domain) or callable(self.codomain):
@@ -379,16 +2081,8 @@ class BinaryRelation:
                 return True
         return False
 
-    def _merge_domains(self, other_relation) -> set:
-        if callable(self.domain) or callable(other_relation.domain):
-            raise ValueError("Operation not implemented for function-based domains.")
-        result_domain = self.domain.copy()
-        result_domain.update(other_relation.domain)
-        return result_domain
+    def _merge_domains(self, other_relation) -> Set[Any] | Callable[[Any], bool]:
+        return _join_members(self.domain, other_relation.domain)
 
-    def _merge_codomains(self, other_relation) -> set:
-        if callable(self.codomain) or callable(other_relation.codomain):
-            raise ValueError("Operation not implemented for function-based codomains.")
-        result_codomain = self.codomain.copy()
-        result_codomain.update(other_relation.codomain)
-        return result_codomain
+    def _merge_codomains(self, other_relation) -> Set[Any] | Callable[[Any], bool]:
+        return _join_members(self.codomain, other_relation.codomain)
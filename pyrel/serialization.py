@@ -0,0 +1,217 @@
+import bisect
+import mmap as mmap_module
+import json
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Set as AbstractSet
+from typing import Any, Iterable, Iterator
+
+from pyrel.bitmatrix import Interner
+
+# File layout, all integers little-endian:
+#   header    magic, format version, flags, id width, #elements, #pairs, #meta
+#   meta      UTF-8 JSON: the element table, domain and codomain as ids into
+#             it, and the dense flag. Elements are tagged plain data rather
+#             than pickles, so loading a file never runs code from it.
+#   padding   zero bytes up to an 8-byte boundary
+#   offsets   (#elements + 1) int64, row a spans targets[offsets[a]:offsets[a+1]]
+#   targets   #pairs ids of the given width, sorted within each row
+MAGIC = b"PYREL\x00"
+VERSION = 2
+_HEADER = struct.Struct("<6sHBBQQQ")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class MappedPairs(AbstractSet):
+    name = "mapped"
+    capabilities = frozenset({"successors"})
+
+    def __init__(
+        self,
+        elements: list[Any],
+        offsets: Any,
+        targets: Any,
+        keep_alive: Any = None,
+    ) -> None:
+        self._table = Interner(elements)
+        self._offsets = offsets
+        self._targets = targets
+        self._keep_alive = keep_alive
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[tuple[Any, Any]]) -> set:
+        return set(it)
+
+    def copy(self) -> set:
+        return set(self)
+
+    def successors(self, a: Any) -> Iterator[Any]:
+        i = self._table.ids.get(a)
+        if i is None:
+            return
+        elements = self._table.elements
+        lo, hi = self._offsets[i], self._offsets[i + 1]
+        for j in self._targets[lo:hi]:
+            yield elements[j]
+
+    def __contains__(self, pair: object) -> bool:
+        try:
+            a, b = pair  # type: ignore[misc]
+            i = self._table.ids.get(a)
+            j = self._table.ids.get(b)
+        except (TypeError, ValueError):
+            return False
+        if i is None or j is None:
+            return False
+        lo, hi = self._offsets[i], self._offsets[i + 1]
+        k = bisect.bisect_left(self._targets, j, lo, hi)
+        return k < hi and self._targets[k] == j
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        elements = self._table.elements
+        offsets = self._offsets
+        targets = self._targets
+        for i, a in enumerate(elements):
+            lo, hi = offsets[i], offsets[i + 1]
+            for j in targets[lo:hi]:
+                yield (a, elements[j])
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def __repr__(self) -> str:
+        return f"{set(self)}"
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def save(
+    path: str | os.PathLike,
+    pairs: Iterable[tuple[Any, Any]],
+    domain: Any,
+    codomain: Any,
+    dense: bool = False,
+) -> None:
+    if callable(domain):
+        raise ValueError("Operation not implemented for function-based domains.")
+    if callable(codomain):
+        raise ValueError("Operation not implemented for function-based codomains.")
+    table = Interner()
+    domain_ids = [table.intern(elem) for elem in domain]
+    codomain_ids = [table.intern(elem) for elem in codomain]
+    rows: dict[int, list[int]] = {}
+    n_pairs = 0
+    for a, b in pairs:
+        rows.setdefault(table.intern(a), []).append(table.intern(b))
+        n_pairs += 1
+    n_elements = len(table)
+    id_code = "i" if n_elements < 2**31 else "q"
+    offsets = array("q", [0] * (n_elements + 1))
+    targets = array(id_code)
+    for i in range(n_elements):
+        row = rows.get(i)
+        if row is not None:
+            row.sort()
+            targets.extend(row)
+        offsets[i + 1] = len(targets)
+    meta = json.dumps(
+        {
+            "elements": [_encode(elem) for elem in table.elements],
+            "domain": domain_ids,
+            "codomain": codomain_ids,
+            "dense": dense,
+        },
+        separators=(",", ":"),
+    ).encode()
+    if not _LITTLE_ENDIAN:
+        offsets.byteswap()
+        targets.byteswap()
+    with open(path, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                MAGIC, VERSION, 0, targets.itemsize, n_elements, n_pairs, len(meta)
+            )
+        )
+        f.write(meta)
+        f.write(b"\x00" * _padding(_HEADER.size + len(meta)))
+        offsets.tofile(f)
+        targets.tofile(f)
+
+
+def load(
+    path: str | os.PathLike, mmap: bool = True
+) -> tuple[MappedPairs, Any, Any, bool]:
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} is not a pyrel relation file")
+        fields = _HEADER.unpack(header)
+        magic, version, _, id_size, n_elements, n_pairs, meta_size = fields
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a pyrel relation file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported pyrel file version {version}")
+        try:
+            meta = json.loads(f.read(meta_size))
+            elements = [_decode(elem) for elem in meta["elements"]]
+            domain = {elements[i] for i in meta["domain"]}
+            codomain = {elements[i] for i in meta["codomain"]}
+            dense = bool(meta["dense"])
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(f"{path} has corrupt metadata") from None
+        start = _HEADER.size + meta_size + _padding(_HEADER.size + meta_size)
+        id_code = "i" if id_size == 4 else "q"
+        if mmap and _LITTLE_ENDIAN:
+            buffer = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_READ)
+            view = memoryview(buffer)
+            offsets_end = start + 8 * (n_elements + 1)
+            targets_end = offsets_end + id_size * n_pairs
+            pairs = MappedPairs(
+                elements,
+                view[start:offsets_end].cast("q"),
+                view[offsets_end:targets_end].cast(id_code),
+                buffer,
+            )
+            return pairs, domain, codomain, dense
+        f.seek(start)
+        offsets = array("q")
+        offsets.fromfile(f, n_elements + 1)
+        targets = array(id_code)
+        targets.fromfile(f, n_pairs)
+        if not _LITTLE_ENDIAN:
+            offsets.byteswap()
+            targets.byteswap()
+        return MappedPairs(elements, offsets, targets), domain, codomain, dense
+
+
+def _encode(elem: Any) -> Any:
+    # JSON has no tuples, sets or bytes, and lists are never elements, so a
+    # list is a tuple and the other two are tagged objects
+    if elem is None or isinstance(elem, (bool, int, float, str)):
+        return elem
+    if isinstance(elem, tuple):
+        return [_encode(item) for item in elem]
+    if isinstance(elem, frozenset):
+        return {"frozenset": [_encode(item) for item in elem]}
+    if isinstance(elem, bytes):
+        return {"bytes": elem.hex()}
+    raise ValueError(f"Cannot save element {elem!r} of type {type(elem).__name__}")
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_decode(item) for item in value)
+    if isinstance(value, dict):
+        ((tag, payload),) = value.items()
+        if tag == "frozenset":
+            return frozenset(_decode(item) for item in payload)
+        if tag == "bytes":
+            return bytes.fromhex(payload)
+        raise ValueError(f"Unknown element tag {tag!r}")
+    return value
+
+
+def _padding(size: int) -> int:
+    return -size % 8
@@ -0,0 +1,168 @@
+import os
+import pickle
+import tempfile
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Optional
+
+Pair = tuple[Any, Any]
+
+# Pairs pickled per record; keeps per-pair overhead low without large buffers
+_BATCH = 4096
+
+# Files the inputs, or one oversized spilled file, are split into at a time;
+# bigger ones are split again, which keeps the open files and write buffers
+# bounded
+_FAN_OUT = 64
+
+
+def hash_join(
+    left: Iterable[Pair],
+    right: Iterable[Pair],
+    partitions: int,
+    spill_dir: Optional[str | os.PathLike] = None,
+    memory_budget: Optional[int] = None,
+) -> Iterator[Pair]:
+    # Grace hash join of left (a, b) with right (b, c) on b. Both inputs are
+    # partitioned by b into at most _FAN_OUT files, each partition of right is
+    # loaded on its own, and the (a, c) matches are spilled again by a so
+    # duplicates coming from different b can be removed one partition at a
+    # time. A partition of right holding more than memory_budget pairs is
+    # split again, together with its left partition, before it is loaded; the
+    # output can be far larger than the inputs, so a match file over budget is
+    # split again before it is deduplicated.
+    partitions = min(partitions, _FAN_OUT)
+    batch = _batch(partitions, memory_budget)
+    with tempfile.TemporaryDirectory(prefix="pyrel-", dir=spill_dir) as directory:
+        left_parts = _partition(left, 1, partitions, directory, "left", batch)
+        right_parts = _partition(right, 0, partitions, directory, "right", batch)
+        with _Partitions(partitions, directory, "result", batch) as results:
+            for left_path, right_path, right_count in zip(
+                left_parts.paths, right_parts.paths, right_parts.counts
+            ):
+                _join(left_path, right_path, right_count, results, memory_budget, 1)
+        for path, count in zip(results.paths, results.counts):
+            yield from _distinct(path, count, memory_budget, 1)
+
+
+class _Partitions:
+    def __init__(
+        self, count: int, directory: str, name: str, batch: int = _BATCH
+    ) -> None:
+        self.paths = [
+            os.path.join(directory, f"{name}-{i}.pickle") for i in range(count)
+        ]
+        self._files: list[BinaryIO] = [open(path, "wb") for path in self.paths]
+        self._buffers: list[list[Pair]] = [[] for _ in range(count)]
+        self.counts = [0] * count
+        self._batch = batch
+
+    def write(self, key: int, pair: Pair) -> None:
+        i = key % len(self._buffers)
+        buffer = self._buffers[i]
+        buffer.append(pair)
+        self.counts[i] += 1
+        if len(buffer) >= self._batch:
+            pickle.dump(buffer, self._files[i], pickle.HIGHEST_PROTOCOL)
+            buffer.clear()
+
+    def __enter__(self) -> "_Partitions":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        for buffer, f in zip(self._buffers, self._files):
+            if buffer:
+                pickle.dump(buffer, f, pickle.HIGHEST_PROTOCOL)
+            f.close()
+
+
+def _partition(
+    pairs: Iterable[Pair], key: int, count: int, directory: str, name: str, batch: int
+) -> _Partitions:
+    with _Partitions(count, directory, name, batch) as partitions:
+        for pair in pairs:
+            partitions.write(hash(pair[key]), pair)
+    return partitions
+
+
+def _join(
+    left_path: str,
+    right_path: str,
+    right_count: int,
+    results: _Partitions,
+    memory_budget: Optional[int],
+    level: int,
+) -> None:
+    # Matches of one pair of partitions, written to results. A right side over
+    # budget is split with its left side by a hash of b salted with the level;
+    # a split that separates nothing means the partition holds few distinct b
+    # and is loaded as it is.
+    if memory_budget is not None and right_count > memory_budget:
+        parts = min(-(-right_count // max(memory_budget, 1)), _FAN_OUT)
+        batch = _batch(parts, memory_budget)
+        left_split = _split(left_path, parts, batch, lambda pair: (level, pair[1]))
+        right_split = _split(right_path, parts, batch, lambda pair: (level, pair[0]))
+        for sub_left, sub_right, sub_count in zip(
+            left_split.paths, right_split.paths, right_split.counts
+        ):
+            budget = None if sub_count == right_count else memory_budget
+            _join(sub_left, sub_right, sub_count, results, budget, level + 1)
+        return
+    successors: dict[Any, list[Any]] = {}
+    for b, c in _read(right_path):
+        successors.setdefault(b, []).append(c)
+    os.remove(right_path)
+    for a, b in _read(left_path):
+        for c in successors.get(b, ()):
+            results.write(hash(a), (a, c))
+    os.remove(left_path)
+
+
+def _distinct(
+    path: str, count: int, memory_budget: Optional[int], level: int
+) -> Iterator[Pair]:
+    # The pairs of one spilled file without duplicates. Files over budget are
+    # split by a hash salted with the level, so each split differs from the
+    # one that produced the file; a split that separates nothing means the
+    # file holds few distinct pairs and is deduplicated as it is.
+    if memory_budget is None or count <= memory_budget:
+        yield from set(_read(path))
+        os.remove(path)
+        return
+    parts = min(-(-count // max(memory_budget, 1)), _FAN_OUT)
+    split = _split(
+        path, parts, _batch(parts, memory_budget), lambda pair: (level, pair)
+    )
+    for sub_path, sub_count in zip(split.paths, split.counts):
+        if sub_count == count:
+            yield from _distinct(sub_path, sub_count, None, level + 1)
+        else:
+            yield from _distinct(sub_path, sub_count, memory_budget, level + 1)
+
+
+def _split(
+    path: str, parts: int, batch: int, key: Callable[[Pair], Any]
+) -> _Partitions:
+    # Spreads a spilled file over parts files next to it by hash of key
+    directory, name = os.path.split(path)
+    name = name.removesuffix(".pickle")
+    with _Partitions(parts, directory, name, batch) as split:
+        for pair in _read(path):
+            split.write(hash(key(pair)), pair)
+    os.remove(path)
+    return split
+
+
+def _batch(count: int, memory_budget: Optional[int]) -> int:
+    # Write buffers across all partitions stay within the budget
+    if memory_budget is None:
+        return _BATCH
+    return max(1, min(_BATCH, memory_budget // count))
+
+
+def _read(path: str) -> Iterator[Pair]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
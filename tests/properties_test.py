@@ -1,6 +1,16 @@
+import itertools
+import json
+import math
 import numbers
+import pickle
+import random
+import struct
 
 import pytest
+
+import pyrel
+from pyrel import parallel, spill
+from pyrel.backends import Universe
 from pyrel.relations import BinaryRelation
 
 
@@ -441,3 +451,1210 @@ def test_from_function():
 
     assert (4, 16) in r
     assert (5, 25) not in r
+
+
+def test_transitive_after_mutation():
+    r = BinaryRelation(domain={1, 2, 3}, codomain={1, 2, 3})
+    r.add_pair((1, 2))
+    r.add_pair((2, 3))
+
+    assert not r.is_transitive()
+
+    r.add_pair((1, 3))
+
+    assert r.is_transitive()
+
+    r.remove_pair((1, 3))
+
+    assert not r.is_transitive()
+
+
+def test_set_operations_do_not_mutate_operands():
+    r1 = BinaryRelation(
+        domain={1, 2, 3}, codomain={1, 2, 3, 4}, relation={(1, 1), (2, 2), (3, 3)}
+    )
+    r2 = BinaryRelation(
+        domain={1, 2, 3},
+        codomain={1, 2, 3, 4},
+        relation={(1, 1), (1, 2), (1, 3), (1, 4)},
+    )
+
+    r1.intersection(r2)
+    r1.difference(r2)
+    r1.symmetric_difference(r2)
+
+    assert r1.relation == {(1, 1), (2, 2), (3, 3)}
+    assert r2.relation == {(1, 1), (1, 2), (1, 3), (1, 4)}
+
+
+def test_dense_properties():
+    domain = {1, 2, 3, 4}
+    order = BinaryRelation(
+        domain=domain,
+        relation={(a, b) for a in domain for b in domain if a <= b},
+        dense=True,
+    )
+    strict = BinaryRelation(
+        domain=domain,
+        relation={(a, b) for a in domain for b in domain if a < b},
+        dense=True,
+    )
+    equal = BinaryRelation(domain=domain, relation={(a, a) for a in domain}, dense=True)
+
+    assert order.dense
+    assert order.is_reflexive() and not strict.is_reflexive()
+    assert strict.is_irreflexive() and not order.is_irreflexive()
+    assert equal.is_symmetric() and not order.is_symmetric()
+    assert order.is_antisymmetric()
+    assert strict.is_asymmetric() and not order.is_asymmetric()
+    assert order.is_transitive() and strict.is_transitive()
+    assert len(order) == 10
+    assert (1, 4) in order and (4, 1) not in order
+
+
+def test_dense_algebra_matches_sparse():
+    domain = {1, 2, 3, 4}
+    pairs1 = {(1, 1), (1, 4), (2, 3), (3, 1), (3, 4)}
+    pairs2 = {(1, 2), (2, 3), (3, 4), (4, 1), (1, 4)}
+
+    sparse1 = BinaryRelation(domain=domain, codomain=domain, relation=pairs1)
+    sparse2 = BinaryRelation(domain=domain, codomain=domain, relation=pairs2)
+    dense1 = BinaryRelation(domain=domain, relation=pairs1, dense=True)
+    dense2 = BinaryRelation(domain=domain, relation=pairs2, dense=True)
+
+    assert dense1.union(dense2).relation == sparse1.union(sparse2).relation
+    assert (
+        dense1.intersection(dense2).relation == sparse1.intersection(sparse2).relation
+    )
+    assert dense1.difference(dense2).relation == sparse1.difference(sparse2).relation
+    assert (
+        dense1.symmetric_difference(dense2).relation
+        == sparse1.symmetric_difference(sparse2).relation
+    )
+    assert dense1.compose(dense2).relation == sparse1.compose(sparse2).relation
+    assert dense1.inverse().relation == sparse1.inverse().relation
+    assert dense1.complement().relation == sparse1.complement().relation
+    assert dense1.complement().dense
+    assert dense1.relation == pairs1
+
+
+def test_dense_checks_with_differing_domain_and_codomain():
+    pairs = {(1, 2), (2, 3)}
+    dense = BinaryRelation({1, 2}, {2, 3}, relation=pairs, dense=True)
+    sparse = BinaryRelation({1, 2}, {2, 3}, relation=pairs)
+    assert not sparse.is_transitive()
+    assert not dense.is_transitive()
+    assert dense.inverse().relation == {(2, 1), (3, 2)}
+    moved = sparse.to_backend("bitmatrix")
+    assert not moved.is_transitive()
+
+
+def test_bitmatrix_transpose_matches_pairs():
+    rng = random.Random(3)
+    elements = set(range(70))
+    # Both the sparse (per-position) and dense (digit string) transposes
+    for density in (0.02, 0.3):
+        pairs = {(a, b) for a in elements for b in elements if rng.random() < density}
+        dense = BinaryRelation(elements, relation=pairs, dense=True)
+        assert dense.inverse().relation == {(b, a) for a, b in pairs}
+        assert not dense.is_symmetric()
+        assert dense.symmetric_closure().is_symmetric()
+
+
+def test_dense_add_and_remove_pair():
+    r = BinaryRelation(domain={"a", "b"}, codomain={"x", "y"}, dense=True)
+    r.add_pair(("a", "x"))
+    r.add_pair(("a", "x"))
+
+    with pytest.raises(ValueError):
+        r.add_pair(("x", "a"))
+
+    assert len(r) == 1
+
+    r.remove_pair(("a", "x"))
+
+    with pytest.raises(KeyError):
+        r.remove_pair(("a", "x"))
+
+    assert len(r) == 0
+
+
+def test_dense_requires_finite_domain():
+    with pytest.raises(ValueError):
+        BinaryRelation(domain=lambda x: isinstance(x, int), dense=True)
+
+
+def test_transitive_closure():
+    domain = {1, 2, 3, 4, 5}
+    pairs = {(1, 2), (2, 3), (3, 1), (3, 4), (5, 5)}
+    expected = {(a, b) for a in (1, 2, 3) for b in (1, 2, 3, 4)} | {(5, 5)}
+
+    sparse = BinaryRelation(domain=domain, codomain=domain, relation=pairs)
+    dense = BinaryRelation(domain=domain, relation=pairs, dense=True)
+
+    assert sparse.transitive_closure().relation == expected
+    assert dense.transitive_closure().relation == expected
+    assert sparse.transitive_closure().is_transitive()
+    assert sparse.relation == pairs
+
+
+def test_reflexive_and_symmetric_closure():
+    r = BinaryRelation(domain={1, 2, 3}, codomain={1, 2, 3}, relation={(1, 2)})
+
+    assert r.reflexive_closure().relation == {(1, 1), (2, 2), (3, 3), (1, 2)}
+    assert r.symmetric_closure().relation == {(1, 2), (2, 1)}
+
+
+def test_equivalence_closure():
+    r = BinaryRelation(
+        domain={1, 2, 3, 4}, codomain={1, 2, 3, 4}, relation={(1, 2), (3, 2)}
+    )
+
+    closure = r.equivalence_closure()
+    block = {(a, b) for a in (1, 2, 3) for b in (1, 2, 3)}
+
+    assert closure.relation == block | {(4, 4)}
+    assert closure.is_reflexive() and closure.is_symmetric()
+    assert closure.is_transitive()
+
+
+def test_equivalence_relation():
+    r1 = BinaryRelation(
+        domain={1, 2, 3},
+        codomain={1, 2, 3},
+        relation={(1, 1), (2, 2), (3, 3), (1, 2), (2, 1)},
+    )
+    r2 = BinaryRelation(
+        domain={1, 2, 3},
+        codomain={1, 2, 3},
+        relation={(1, 1), (2, 2), (3, 3), (1, 2)},
+    )
+
+    assert r1.is_equivalence_relation()
+    assert not r2.is_equivalence_relation()
+    assert r2.is_equivalence_relation(explain=True) == ("symmetric", ((1, 2),))
+
+
+def test_orders():
+    domain = {1, 2, 3, 4}
+    divides = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if b % a == 0},
+    )
+    less_equal = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if a <= b},
+    )
+    less = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if a < b},
+    )
+
+    assert divides.is_partial_order() and not divides.is_total_order()
+    assert divides.is_total_order(explain=True).name == "connected"
+    assert less_equal.is_partial_order() and less_equal.is_total_order()
+    assert not less_equal.is_strict_partial_order()
+    assert less.is_strict_partial_order() and less.is_strict_total_order()
+    assert not less.is_partial_order()
+    assert less.is_partial_order(explain=True) == ("reflexive", (1,))
+    assert less_equal.is_total_order(explain=True) is None
+
+
+def test_mapping_properties():
+    square = BinaryRelation(
+        domain={-1, 0, 1},
+        codomain={0, 1},
+        relation={(-1, 1), (0, 0), (1, 1)},
+    )
+    identity = BinaryRelation(
+        domain={1, 2, 3},
+        codomain={1, 2, 3},
+        relation={(1, 1), (2, 2), (3, 3)},
+    )
+    partial = BinaryRelation(
+        domain={1, 2, 3},
+        codomain={1, 2, 3, 4},
+        relation={(1, 1), (1, 2), (2, 3)},
+    )
+
+    assert square.is_function() and square.is_surjection()
+    assert not square.is_injective() and not square.is_bijection()
+    assert square.is_many_to_one() and not square.is_one_to_one()
+    assert identity.is_bijection() and identity.is_one_to_one()
+    assert not partial.is_functional() and not partial.is_serial()
+    assert partial.is_one_to_many() and not partial.is_many_to_many()
+    assert partial.is_serial(explain=True) == ("serial", (3,))
+    assert partial.is_surjective(explain=True) == ("surjective", (4,))
+    assert partial.is_functional(explain=True).name == "functional"
+
+
+def test_cached_results_invalidated_on_mutation():
+    r = BinaryRelation(domain={1, 2, 3}, codomain={1, 2, 3}, relation={(1, 2)})
+
+    assert not r.is_symmetric()
+    assert r.inverse().relation == {(2, 1)}
+
+    version = r.version
+    r.add_pair((2, 1))
+
+    assert r.version > version
+    assert r.is_symmetric()
+    assert r.inverse().relation == {(1, 2), (2, 1)}
+
+    r.remove_pair((2, 1))
+
+    assert not r.is_symmetric()
+
+
+def test_cached_derived_relation_is_not_shared():
+    r = BinaryRelation(domain={1, 2}, codomain={1, 2}, relation={(1, 2)})
+
+    inverse = r.inverse()
+    inverse.add_pair((1, 1))
+
+    assert r.inverse().relation == {(2, 1)}
+
+
+def test_relation_view_reads_current_pairs():
+    elements = set(range(20))
+    r = BinaryRelation(
+        elements, elements.copy(), relation={(a, a + 1) for a in range(19)}
+    )
+    other = BinaryRelation(elements, elements.copy(), relation={(0, 0), (1, 2)})
+    view = r.relation
+    assert not r.isdisjoint(other) and other.isdisjoint(r.inverse())
+    r.union(other)
+    r.add_pair((5, 5))
+    assert (5, 5) in view
+
+    kept = r.union(other)
+    copied = r.copy()
+    r.add_pair((6, 6))
+    assert (6, 6) in view and (6, 6) in r and len(view) == 21
+    assert (6, 6) not in kept and (6, 6) not in copied
+    r.remove_pair((0, 1))
+    assert (0, 1) not in view and (0, 1) in kept.relation
+
+
+def test_relation_view_is_read_only():
+    r = BinaryRelation(domain={1, 2}, codomain={1, 2}, relation={(1, 2)})
+
+    with pytest.raises(AttributeError):
+        r.relation.add((2, 1))  # type: ignore[attr-defined]
+
+    pairs = r.relation.copy()
+    pairs.add((2, 1))
+
+    assert (2, 1) not in r
+    assert r.relation == {(1, 2)}
+
+
+def test_tracked_properties_follow_inserts():
+    r = BinaryRelation(domain={1, 2, 3}, codomain={1, 2, 3}, tracked=True)
+
+    assert r.tracked
+    assert r.is_symmetric() and r.is_irreflexive() and r.is_asymmetric()
+
+    r.add_pair((1, 2))
+
+    assert not r.is_symmetric() and r.is_antisymmetric() and r.is_asymmetric()
+
+    r.add_pair((2, 1))
+
+    assert r.is_symmetric() and not r.is_antisymmetric()
+
+    for elem in (1, 2, 3):
+        r.add_pair((elem, elem))
+
+    assert r.is_reflexive() and not r.is_irreflexive()
+
+    r.remove_pair((2, 1))
+    r.remove_pair((3, 3))
+
+    assert not r.is_symmetric() and r.is_antisymmetric()
+    assert not r.is_reflexive() and not r.is_asymmetric()
+
+    r.update(BinaryRelation(domain={4}, codomain={4}, relation={(4, 4), (2, 1)}))
+
+    assert r.is_symmetric() and not r.is_reflexive()
+
+
+def test_tracked_matches_untracked():
+    rng = random.Random(7)
+    domain = set(range(6))
+    tracked = BinaryRelation(domain=domain, codomain=domain, tracked=True)
+    plain = BinaryRelation(domain=domain, codomain=domain)
+    for _ in range(200):
+        pair = (rng.randrange(6), rng.randrange(6))
+        if pair in plain and rng.random() < 0.5:
+            tracked.remove_pair(pair)
+            plain.remove_pair(pair)
+        else:
+            tracked.add_pair(pair)
+            plain.add_pair(pair)
+        for check in (
+            "is_reflexive",
+            "is_irreflexive",
+            "is_symmetric",
+            "is_antisymmetric",
+            "is_asymmetric",
+        ):
+            assert getattr(tracked, check)() == getattr(plain, check)()
+
+
+def test_abstract_type_domain():
+    r = BinaryRelation(domain=numbers.Real, codomain=numbers.Real)
+    r.add_pair((5, 7))
+    r.add_pair((0.5, -2))
+
+    with pytest.raises(ValueError):
+        r.add_pair((1j, 0))
+
+    assert (5, 7) in r
+
+
+def test_range_domain():
+    r = BinaryRelation(domain=range(10), codomain=range(0, 100, 2))
+    r.add_pair((3, 6))
+
+    with pytest.raises(ValueError):
+        r.add_pair((3, 7))
+
+    with pytest.raises(ValueError):
+        r.add_pair((10, 6))
+
+    assert (3, 6) in r
+
+
+def test_add_pairs():
+    r = BinaryRelation(domain={1, 2, 3}, codomain={1, 2, 3})
+    r.add_pairs((a, b) for a in (1, 2, 3) for b in (1, 2, 3) if a <= b)
+
+    assert len(r) == 6
+    assert r.is_partial_order()
+
+    with pytest.raises(ValueError):
+        r.add_pairs([(3, 1), (4, 1)])
+
+    assert not r.is_antisymmetric()
+
+
+def test_add_pairs_tracked():
+    r = BinaryRelation(domain={1, 2}, codomain={1, 2}, tracked=True)
+    r.add_pairs([(1, 2), (2, 1), (1, 2)])
+
+    assert len(r) == 2
+    assert r.is_symmetric() and not r.is_antisymmetric()
+
+
+def test_from_columns():
+    r = BinaryRelation.from_columns(
+        [1, 1, 2, 3], [2, 3, 3, 3], domain={1, 2, 3}, codomain={1, 2, 3}, chunk_size=3
+    )
+
+    assert r.relation == {(1, 2), (1, 3), (2, 3), (3, 3)}
+
+    with pytest.raises(ValueError):
+        BinaryRelation.from_columns([1, 4], [2, 2], domain={1, 2, 3})
+
+
+def test_from_csv(tmp_path):
+    path = tmp_path / "edges.tsv"
+    path.write_text("src\tdst\n1\t2\n2\t3\n\n3\t3\n")
+
+    r = BinaryRelation.from_csv(
+        path,
+        domain={1, 2, 3},
+        codomain={1, 2, 3},
+        delimiter="\t",
+        columns=("src", "dst"),
+        header=True,
+        converters=(int, int),
+        chunk_size=2,
+    )
+
+    assert r.relation == {(1, 2), (2, 3), (3, 3)}
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "divides.rel"
+    domain = set(range(1, 13))
+    r = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if b % a == 0},
+    )
+    r.save(path)
+
+    for mmap in (True, False):
+        loaded = BinaryRelation.load(path, mmap=mmap)
+
+        assert loaded == r
+        assert (3, 12) in loaded and (12, 3) not in loaded
+        assert set(loaded.elements()) == r.relation
+        assert loaded.is_partial_order()
+
+    loaded = BinaryRelation.load(path)
+    loaded.add_pair((12, 1))
+
+    assert (12, 1) in loaded
+    assert len(loaded) == len(r) + 1
+
+
+def test_save_and_load_dense(tmp_path):
+    path = tmp_path / "dense.rel"
+    r = BinaryRelation(domain={"a", "b"}, relation={("a", "b")}, dense=True)
+    r.save(path)
+
+    loaded = BinaryRelation.load(path, mmap=False)
+
+    assert loaded.dense
+    assert loaded.relation == {("a", "b")}
+
+
+def test_save_and_load_structured_elements(tmp_path):
+    path = tmp_path / "mixed.rel"
+    domain = {None, True, 2, 2.5, "x", b"\x00\xff", (1, ("a", None))}
+    codomain = {frozenset({1, (2, 3)}), frozenset(), ()}
+    pairs = {(a, b) for a in domain for b in codomain if hash((a, b)) % 3}
+    r = BinaryRelation(domain=domain, codomain=codomain, relation=pairs)
+    r.save(path)
+
+    loaded = BinaryRelation.load(path, mmap=False)
+
+    assert loaded.domain == domain and loaded.codomain == codomain
+    assert loaded.relation == pairs
+
+    with pytest.raises(ValueError):
+        BinaryRelation(domain={object()}).save(tmp_path / "object.rel")
+
+
+def test_load_never_unpickles(tmp_path):
+    class Payload:
+        def __reduce__(self):
+            return (exec, ("import pyrel; pyrel.unpickled = True",))
+
+    meta = pickle.dumps(Payload())
+    header = struct.pack("<6sHBBQQQ", b"PYREL\x00", 2, 0, 4, 0, 0, len(meta))
+    path = tmp_path / "payload.rel"
+    path.write_bytes(header + meta + b"\x00" * (-len(header + meta) % 8) + bytes(8))
+
+    with pytest.raises(ValueError):
+        BinaryRelation.load(path)
+    assert not hasattr(pyrel, "unpickled")
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "edges.csv"
+    path.write_text("1,2\n")
+
+    with pytest.raises(ValueError):
+        BinaryRelation.load(path)
+
+
+def test_lazy_expression_matches_eager():
+    domain = set(range(6))
+    r = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if a < b},
+    )
+    s = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if b == a + 1},
+    )
+    t = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if (a + b) % 2 == 0},
+    )
+
+    eager = r.compose(s).intersection(t).inverse()
+    lazy = r.lazy().compose(s).intersection(t).inverse()
+
+    assert set(lazy) == eager.relation
+    assert lazy.collect() == eager
+    assert set(r.lazy().union(s).difference(t).elements()) == (
+        r.union(s).difference(t).relation
+    )
+    assert set(r.lazy().symmetric_difference(s)) == r.symmetric_difference(s).relation
+    assert (0, 2) in r.lazy().compose(s)
+
+
+def test_lazy_restriction_and_join_order():
+    domain = set(range(8))
+    r = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if a <= b},
+    )
+    chain = r.lazy().compose(r).compose(r).compose(r)
+    restricted = chain.restrict(domain={6}, codomain={7})
+
+    assert set(restricted) == {(6, 7)}
+    assert set(r.lazy().inverse().restrict(domain={3})) == {(3, b) for b in range(4)}
+    assert set(chain.optimize()) == r.compose(r).compose(r).compose(r).relation
+
+
+def test_lazy_probes_plan_once(monkeypatch):
+    domain = set(range(30))
+    r = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if a < b},
+    )
+    s = BinaryRelation(
+        domain=domain,
+        codomain=domain,
+        relation={(a, b) for a in domain for b in domain if (a + b) % 3 == 0},
+    )
+    plans = 0
+    optimize = pyrel.lazy.LazyRelation.optimize
+
+    def counted(self):
+        nonlocal plans
+        plans += 1
+        return optimize(self)
+
+    monkeypatch.setattr(pyrel.lazy.LazyRelation, "optimize", counted)
+    expression = r.lazy().intersection(s).union(r.lazy().difference(s))
+    assert set(expression) == r.relation
+    assert plans == 1
+
+
+def test_set_operation_results_do_not_alias_operands():
+    elements = {1, 2, 3}
+    r = BinaryRelation(elements, elements.copy(), relation={(1, 2), (2, 3)})
+    s = BinaryRelation(elements, elements.copy(), relation={(2, 3), (3, 1)})
+    union = r.union(s)
+    inter = r.intersection(s)
+    diff = r.difference(s)
+    sym = r.symmetric_difference(s)
+    r.add_pair((1, 1))
+    s.remove_pair((2, 3))
+    assert union.relation == {(1, 2), (2, 3), (3, 1)}
+    assert inter.relation == {(2, 3)}
+    assert diff.relation == {(1, 2)}
+    assert sym.relation == {(1, 2), (3, 1)}
+    union.add_pair((3, 3))
+    assert (3, 3) not in r and (3, 3) not in s
+    assert r.relation == {(1, 1), (1, 2), (2, 3)}
+
+
+def test_copy_shares_until_mutation():
+    r = BinaryRelation(domain={1, 2}, codomain={1, 2}, relation={(1, 2)}, tracked=True)
+    c = r.copy()
+    c.add_pair((2, 1))
+    assert r.relation == {(1, 2)}
+    assert c.relation == {(1, 2), (2, 1)}
+    assert c.is_symmetric() and not r.is_symmetric()
+
+
+def test_in_place_set_operations():
+    elements = {1, 2, 3}
+    r = BinaryRelation(elements, elements.copy(), relation={(1, 2), (2, 3), (3, 1)})
+    s = BinaryRelation(elements, elements.copy(), relation={(2, 3), (3, 3)})
+    assert r.copy().intersection_update(s).relation == {(2, 3)}
+    assert r.copy().difference_update(s).relation == {(1, 2), (3, 1)}
+    assert r.copy().symmetric_difference_update(s).relation == {
+        (1, 2),
+        (3, 1),
+        (3, 3),
+    }
+    d = BinaryRelation(domain={1, 2, 3}, relation=r.relation, dense=True)
+    d.difference_update(s)
+    assert d.relation == {(1, 2), (3, 1)}
+    assert r.relation == {(1, 2), (2, 3), (3, 1)}
+
+
+def test_from_grid_matches_pairwise_construction():
+    n = 12
+    symbolic = [
+        lambda a, b: a <= b,
+        lambda a, b: a > 0 and b % a == 0,
+        lambda a, b: (b - a > 2) & (b % 3 != 1),
+        lambda a, b: str(b).endswith("1"),
+        lambda a, b: b < math.inf and a < -math.inf,
+        lambda a, b: b <= math.inf,
+    ]
+    scalar = [
+        lambda a, b: isinstance(b, int) and b > a,
+        lambda a, b: b < 7 if isinstance(b, numbers.Integral) else b <= 7,
+    ]
+    for predicate in symbolic + scalar:
+        expected = {(a, b) for a in range(n) for b in range(n) if predicate(a, b)}
+        assert BinaryRelation.from_grid(n, predicate).relation == expected
+        if predicate in symbolic:
+            relation = BinaryRelation.from_grid(n, predicate, symbolic=True)
+            assert relation.relation == expected
+
+
+def test_from_grid_evaluates_every_cell_by_default():
+    def predicate(a, b):
+        return b < 22 if isinstance(b, numbers.Integral) else b <= 22
+
+    relation = BinaryRelation.from_grid(41, predicate)
+    assert relation.relation == {(a, b) for a in range(41) for b in range(22)}
+
+
+def test_from_grid_properties_and_algebra():
+    leq = BinaryRelation.from_grid(10, lambda a, b: a <= b, symbolic=True)
+    assert leq.is_partial_order() and leq.is_total_order()
+    lt = BinaryRelation.from_grid(10, lambda a, b: a < b)
+    assert lt.is_strict_partial_order()
+    assert leq.difference(lt).relation == {(a, a) for a in range(10)}
+    assert lt.inverse().relation == {(b, a) for a, b in lt.relation}
+    wide = BinaryRelation.from_grid(3, lambda a, b: b == a + 2, m=5, symbolic=True)
+    assert wide.relation == {(0, 2), (1, 3), (2, 4)}
+
+
+def test_function_relation_memoizes_and_batches():
+    calls = []
+
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    relation = BinaryRelation.from_function(domain={1, 2, 3}, func=square)
+    assert (2, 4) in relation and (2, 4) in relation and (2, 5) not in relation
+    assert calls == [2]
+    assert set(relation.elements()) == {(1, 1), (2, 4), (3, 9)}
+    assert sorted(calls) == [1, 2, 3]
+
+    batches = []
+
+    def squares(xs):
+        batches.append(list(xs))
+        return [x * x for x in xs]
+
+    batched = BinaryRelation.from_function(
+        domain=set(range(10)), func=square, batch=squares, chunk_size=4
+    )
+    assert len(batched) == 10
+    assert [len(chunk) for chunk in batches] == [4, 4, 2]
+    assert batched.union(relation).relation == {(x, x * x) for x in range(10)}
+
+
+def test_function_relation_lazy_algebra():
+    def double(x):
+        return 2 * x
+
+    def increment(x):
+        return x + 1
+
+    doubled = BinaryRelation.from_function(domain=lambda x: x >= 0, func=double)
+    incremented = BinaryRelation.from_function(domain=lambda x: x < 10, func=increment)
+    composed = doubled.compose(incremented)
+    assert (3, 7) in composed and (6, 13) not in composed
+    assert (4, 2) in doubled.inverse() and (2, 4) not in doubled.inverse()
+    small = doubled.restriction(domain={0, 1, 2, 3}, codomain=lambda y: y > 2)
+    assert set(small.elements()) == {(2, 4), (3, 6)}
+
+    evens = BinaryRelation(domain={2, 4}, codomain={0, 1}, relation={(4, 0)})
+    finite = BinaryRelation.from_function(domain={1, 2}, func=double, codomain={2, 4})
+    assert finite.compose(evens).relation == {(2, 0)}
+
+
+def test_mutated_function_relation_is_plain_pairs():
+    def double(x):
+        return 2 * x
+
+    f = BinaryRelation.from_function({1, 2, 3}, double, codomain={2, 4, 5, 6})
+    g = BinaryRelation.from_function({2, 4, 5, 6}, double, codomain={4, 8, 10, 12})
+    f.add_pair((1, 5))
+    assert f.image(1) == {2, 5}
+    assert f.compose(g).relation == {(1, 4), (1, 10), (2, 8), (3, 12)}
+    assert f.restriction(domain={1}).relation == {(1, 2), (1, 5)}
+    f.remove_pair((3, 6))
+    assert f.copy().relation == {(1, 2), (1, 5), (2, 4)}
+    assert g.compose(g).relation == {(2, 8)}
+
+
+def test_predicate_relation_over_infinite_domain():
+    leq = BinaryRelation.from_predicate(lambda a, b: a <= b, domain=numbers.Real)
+    lt = BinaryRelation.from_predicate(lambda a, b: a < b, domain=numbers.Real)
+    assert (1.5, 2) in leq and (2, 1.5) not in leq and ("a", "b") not in leq
+    equal = leq.difference(lt)
+    assert (0.25, 0.25) in equal and (0, 1) not in equal
+    assert (3, 2) in leq.complement() and (2, 3) not in leq.complement()
+    assert (3, 2) in lt.inverse() and (2, 3) not in lt.inverse()
+    assert (1, 1) in lt.union(equal) and (2, 1) not in lt.union(equal)
+    with pytest.raises(ValueError):
+        list(leq.elements())
+
+
+def test_predicate_relation_enumerates_finite_domains():
+    divides = BinaryRelation.from_predicate(
+        lambda a, b: b % a == 0, domain={1, 2, 3, 4}
+    )
+    assert set(divides.elements()) == {
+        (1, 1),
+        (1, 2),
+        (1, 3),
+        (1, 4),
+        (2, 2),
+        (2, 4),
+        (3, 3),
+        (4, 4),
+    }
+    assert divides.is_partial_order()
+    explicit = BinaryRelation(
+        domain=numbers.Real, codomain=numbers.Real, relation={(1, 2), (5, 3)}
+    )
+    less = BinaryRelation.from_predicate(lambda a, b: a < b, domain=numbers.Real)
+    assert set(explicit.intersection(less).elements()) == {(1, 2)}
+    explicit_inverse = explicit.inverse()
+    explicit.add_pair((7, 8))
+    assert (8, 7) not in explicit_inverse
+
+
+def test_parallel_checks_match_serial():
+    elements = set(range(30))
+    leq = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if a <= b},
+    )
+    assert leq.is_transitive(workers=2)
+    assert leq.is_connected(workers=2) and leq.is_strongly_connected(workers=2)
+    leq.remove_pair((3, 5))
+    witness = leq.is_transitive(explain=True, workers=2)
+    assert witness is not None and witness.name == "transitive"
+    assert not leq.is_connected(workers=2)
+    successor = BinaryRelation(
+        elements, elements.copy(), relation={(a, a + 1) for a in range(29)}
+    )
+    assert successor.compose(successor, workers=2).relation == {
+        (a, a + 2) for a in range(28)
+    }
+
+
+def test_parallel_checks_on_empty_relations():
+    empty = BinaryRelation(set(), set(), relation=set())
+    assert empty.is_transitive(workers=2)
+    assert empty.is_connected(workers=2) and empty.is_strongly_connected(workers=2)
+    assert len(empty.compose(empty, workers=2)) == 0
+    sparse = BinaryRelation({1, 2}, {1, 2}, relation=set())
+    assert sparse.is_transitive(workers=2) and not sparse.is_connected(workers=2)
+
+
+def test_parallel_connectivity_applies_bounds_first(monkeypatch):
+    def no_pool(*args):
+        raise AssertionError("a worker pool was started")
+
+    monkeypatch.setattr(parallel, "first_result", no_pool)
+    elements = set(range(20))
+    chain = BinaryRelation(
+        elements, elements.copy(), relation={(a, a + 1) for a in range(19)}
+    )
+    assert not chain.is_connected(workers=2)
+    # Enough pairs overall, but element 0 is related to nothing
+    dense = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if 0 not in (a, b)},
+    )
+    assert not dense.is_connected(workers=2)
+    assert not dense.is_strongly_connected(workers=2)
+
+
+def test_compose_iter_matches_compose(tmp_path):
+    elements = set(range(40))
+    first = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if b in (a + 1, a * 2)},
+    )
+    second = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if b % 5 == a % 5},
+    )
+    expected = first.compose(second).relation
+    streamed = list(first.compose_iter(second))
+    assert len(streamed) == len(expected) and set(streamed) == expected
+    spilled = list(first.compose_iter(second, memory_budget=50, spill_dir=tmp_path))
+    assert len(spilled) == len(expected) and set(spilled) == expected
+    assert list(tmp_path.iterdir()) == []
+
+    path = tmp_path / "composed.csv"
+    assert first.compose_to_csv(second, path, memory_budget=50) == len(expected)
+    loaded = BinaryRelation.from_csv(
+        path, domain=elements, codomain=elements, converters=(int, int)
+    )
+    assert loaded.relation == expected
+
+
+def test_spilled_join_splits_oversized_outputs(tmp_path, monkeypatch):
+    # A star join through two hubs: 60 input pairs, 900 distinct output pairs,
+    # each produced twice. Deduplication may never hold more than the budget.
+    largest = 0
+
+    def tracked_set(pairs=()):
+        nonlocal largest
+        result = set(pairs)
+        largest = max(largest, len(result))
+        return result
+
+    # Every deduplicated file passes through set() in the spill module
+    monkeypatch.setattr(spill, "set", tracked_set, raising=False)
+    left = [(a, hub) for a in range(30) for hub in ("x", "y")]
+    right = [(hub, c) for hub in ("x", "y") for c in range(30)]
+    joined = list(spill.hash_join(left, right, 2, tmp_path, memory_budget=100))
+    assert len(joined) == 900
+    assert set(joined) == set(itertools.product(range(30), range(30)))
+    assert largest <= 100
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spilled_join_bounds_open_files(tmp_path, monkeypatch):
+    opened = 0
+    peak = 0
+
+    class TrackedFile:
+        def __init__(self, f):
+            nonlocal opened, peak
+            self._file = f
+            opened += 1
+            peak = max(peak, opened)
+
+        def __getattr__(self, name):
+            return getattr(self._file, name)
+
+        def close(self):
+            nonlocal opened
+            opened -= 1
+            self._file.close()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.close()
+
+    monkeypatch.setattr(spill, "_FAN_OUT", 4)
+    monkeypatch.setattr(spill, "open", lambda *args: TrackedFile(open(*args)), False)
+    left = [(a, a % 50) for a in range(200)]
+    right = [(b, b + c) for b in range(50) for c in range(4)]
+    joined = list(spill.hash_join(left, right, 1000, tmp_path, memory_budget=10))
+    assert set(joined) == {(a, a % 50 + c) for a in range(200) for c in range(4)}
+    assert len(joined) == 800
+    # Result partitions, one split being written and the file it reads
+    assert 0 < peak <= 2 * 4 + 1 and opened == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_connectivity_matches_pairwise_definition():
+    rng = random.Random(7)
+    elements = set(range(6))
+    for _ in range(200):
+        pairs = {(a, b) for a in elements for b in elements if rng.random() < 0.6}
+        connected = all(
+            (a, b) in pairs or (b, a) in pairs
+            for a in elements
+            for b in elements
+            if a != b
+        )
+        strongly = connected and all((a, a) in pairs for a in elements)
+        for dense in (False, True):
+            r = BinaryRelation(elements, elements.copy(), relation=pairs, dense=dense)
+            assert r.is_connected() == connected
+            assert r.is_strongly_connected() == strongly
+
+
+def test_connectivity_rejects_sparse_relations_by_size():
+    elements = set(range(2000))
+    r = BinaryRelation(elements, elements.copy(), relation={(0, 1), (1, 2)})
+    assert not r.is_connected()
+    assert not r.is_strongly_connected()
+
+
+def test_backends_agree():
+    elements = set(range(8))
+    pairs = {(a, b) for a in elements for b in elements if a % (b + 1) == 0}
+    reference = BinaryRelation(elements, elements.copy(), relation=pairs)
+    for backend in ("set", "sorted", "adjacency", "bitmatrix"):
+        r = reference.to_backend(backend)
+        assert r.backend == backend
+        assert r.relation == pairs
+        assert r.is_reflexive() == reference.is_reflexive()
+        assert r.is_transitive() == reference.is_transitive()
+        assert r.is_antisymmetric() == reference.is_antisymmetric()
+        assert r.inverse().relation == reference.inverse().relation
+        assert r.compose(r).relation == reference.compose(reference).relation
+        r.add_pair((1, 7))
+        r.remove_pair((0, 0))
+        assert (1, 7) in r and (0, 0) not in r
+        assert len(r) == len(pairs)
+    assert "bitset" in reference.to_backend("bitmatrix").capabilities
+    assert "ordered" in reference.to_backend("sorted").capabilities
+    with pytest.raises(ValueError):
+        reference.to_backend("btree")
+
+
+@pytest.mark.parametrize("backend", ["sorted", "adjacency", "packed"])
+def test_algebra_results_keep_the_operand_backend(backend):
+    elements = set(range(6))
+    first = BinaryRelation(
+        elements, elements.copy(), relation={(0, 1), (1, 2)}, backend=backend
+    )
+    second = BinaryRelation(
+        elements, elements.copy(), relation={(1, 2), (2, 3)}, backend=backend
+    )
+    for result in (first.union(second), first.symmetric_difference(second)):
+        assert result.backend == backend
+        result.add_pair((5, 5))
+        assert result.backend == backend and (5, 5) in result
+    assert first.union(second).relation == {(0, 1), (1, 2), (2, 3)}
+    predicate = BinaryRelation.from_predicate(lambda a, b: b == a + 4, elements)
+    mixed = first.union(predicate)
+    mixed.add_pair((3, 3))
+    assert mixed.backend == backend
+    assert mixed.relation == {(0, 1), (1, 2), (0, 4), (1, 5), (3, 3)}
+
+
+def test_adjacency_backend_copy_on_write():
+    r = BinaryRelation(
+        {1, 2, 3}, {1, 2, 3}, relation={(1, 2), (2, 3)}, backend="adjacency"
+    )
+    assert r.is_transitive() is False
+    c = r.copy()
+    c.add_pair((1, 3))
+    assert c.is_transitive() and not r.is_transitive()
+    assert r.relation == {(1, 2), (2, 3)}
+    assert c.backend == "adjacency"
+
+
+def test_relations_share_a_universe():
+    universe = Universe()
+    students = {"Jason", "Deborah"}
+    courses = {"CS518", "CS510"}
+    takes = BinaryRelation(
+        students,
+        courses,
+        relation={("Jason", "CS518"), ("Deborah", "CS518"), ("Jason", "CS510")},
+        universe=universe,
+    )
+    passed = BinaryRelation(
+        students, courses, relation={("Jason", "CS518")}, universe=universe
+    )
+    assert takes.backend == "packed" and takes.universe is universe
+    assert ("Jason", "CS510") in takes and ("Deborah", "CS510") not in takes
+    failed = takes.difference(passed)
+    assert failed.backend == "packed"
+    assert set(failed.elements()) == {("Deborah", "CS518"), ("Jason", "CS510")}
+    assert takes.intersection(passed).relation == {("Jason", "CS518")}
+    assert len(universe) == 4
+    passed.add_pair(("Deborah", "CS510"))
+    assert takes.union(passed).relation == takes.relation | {("Deborah", "CS510")}
+    assert failed.relation == {("Deborah", "CS518"), ("Jason", "CS510")}
+    moved = takes.to_backend("packed", universe=Universe())
+    assert moved.relation == takes.relation and moved.universe is not universe
+
+
+def test_benchmark_suite_writes_comparable_json(tmp_path):
+    from benchmarks import suite
+
+    output = tmp_path / "bench.json"
+    args = ["--sizes", "8", "--densities", "0.3", "--repeat", "1"]
+    assert suite.main([*args, "--only", "compose", "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert {entry["operation"] for entry in report["results"]} == {"compose"}
+    assert {entry["structure"] for entry in report["results"]} == {
+        "random",
+        "chain",
+        "total_order",
+        "equivalence",
+    }
+    assert suite.compare(report, report, threshold=2.0) == []
+
+
+def test_profile_records_calls_scans_and_early_exits():
+    elements = set(range(10))
+    chain = BinaryRelation(
+        elements, elements.copy(), relation={(a, a + 1) for a in range(9)}
+    )
+    contains = BinaryRelation.__contains__
+    with pyrel.profile() as p:
+        assert not chain.is_transitive()
+        assert not chain.is_transitive()
+        assert chain.is_antisymmetric()
+        assert (0, 1) in chain and (1, 0) not in chain
+        chain.union(chain.inverse())
+    assert p["is_transitive"].calls == 2 and p["is_transitive"].cache_hits == 1
+    assert p["is_transitive"].early_exits == 1
+    assert p["is_antisymmetric"].pairs_scanned == 9
+    assert p["__contains__"].calls == 2
+    assert p["union"].calls == 1 and p["inverse"].calls == 1
+    assert "is_transitive" in p.report()
+    assert BinaryRelation.__contains__ is contains
+
+
+def test_profile_reports_the_scans_own_visit_counts():
+    elements = set(range(50))
+    upper = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if a < b},
+    )
+    with pyrel.profile() as p:
+        assert not upper.is_reflexive()
+        assert upper.is_irreflexive()
+    # The scan stops at the first domain element, which has no loop
+    assert p["is_reflexive"].exit_positions == [1]
+    assert p["is_reflexive"].pairs_scanned == 1
+    assert p["is_irreflexive"].pairs_scanned == 50
+    assert p["is_irreflexive"].early_exits == 0
+
+
+def test_profiled_scans_match_the_default_scans():
+    rng = random.Random(21)
+    elements = set(range(8))
+    scan, scan_mapping = BinaryRelation._scan, BinaryRelation._scan_mapping
+    flags = ["reflexive", "irreflexive", "symmetric", "antisymmetric"]
+    flags += ["asymmetric", "transitive", "connected"]
+    mapping_flags = ["functional", "injective", "serial", "surjective"]
+    for _ in range(20):
+        pairs = {(a, b) for a in elements for b in elements if rng.random() < 0.3}
+        r = BinaryRelation(elements, elements.copy(), relation=pairs)
+        expected = [r._scan(**{flag: True}) for flag in flags]
+        expected += [r._scan_mapping(**{flag: True}) for flag in mapping_flags]
+        with pyrel.profile():
+            assert BinaryRelation._scan is not scan
+            profiled = [r._scan(**{flag: True}) for flag in flags]
+            profiled += [r._scan_mapping(**{flag: True}) for flag in mapping_flags]
+        assert profiled == expected
+    assert BinaryRelation._scan is scan
+    assert BinaryRelation._scan_mapping is scan_mapping
+
+
+def test_graph_algorithms():
+    elements = set(range(7))
+    dag = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(0, 1), (0, 2), (1, 3), (2, 3), (3, 4), (5, 4)},
+    )
+    order = dag.topological_order()
+    assert sorted(order) == list(range(7))
+    assert all(order.index(a) < order.index(b) for a, b in dag.relation)
+    assert dag.is_well_founded() and not dag.has_cycle()
+    assert set(dag.reachable_from(0)) == {1, 2, 3, 4}
+    assert list(dag.reachable_from(6)) == []
+    assert len(dag.strongly_connected_components()) == 7
+
+    dag.add_pair((4, 1))
+    cycle = dag.find_cycle()
+    assert cycle is not None and set(cycle) == {1, 3, 4}
+    witness = dag.is_well_founded(explain=True)
+    assert witness is not None and witness.name == "well_founded"
+    assert all(step in dag for step in witness.witness)
+    assert {1, 3, 4} in dag.strongly_connected_components()
+    with pytest.raises(ValueError):
+        dag.topological_order()
+
+    loop = BinaryRelation({1}, {1}, relation={(1, 1)})
+    assert not loop.is_well_founded()
+
+
+def test_equivalence_classes_and_quotient():
+    elements = set(range(8))
+    mod3 = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if a % 3 == b % 3},
+    )
+    assert mod3.is_equivalence_relation()
+    classes = mod3.equivalence_classes()
+    assert sorted(map(sorted, classes)) == [[0, 3, 6], [1, 4, 7], [2, 5]]
+    assert mod3.class_of(4) == {1, 4, 7}
+    with pytest.raises(ValueError):
+        mod3.class_of(9)
+
+    successor = BinaryRelation(
+        elements, elements.copy(), relation={(a, a + 1) for a in range(7)}
+    )
+    quotient = mod3.quotient(successor)
+    blocks = {frozenset(c) for c in classes}
+    assert quotient.domain == blocks
+    assert (mod3.class_of(0), mod3.class_of(1)) in quotient
+    assert len(quotient) == 3
+
+    generators = BinaryRelation(elements, elements.copy(), relation={(0, 1), (2, 1)})
+    closure = generators.equivalence_closure()
+    assert closure.is_equivalence_relation()
+    assert (0, 2) in closure and (0, 3) not in closure and (5, 5) in closure
+    assert generators.class_of(2) == {0, 1, 2}
+    assert len(generators.equivalence_classes()) == 6
+
+
+def test_transitive_reduction_and_hasse():
+    divisors = {1, 2, 3, 4, 6, 12}
+    divides = BinaryRelation(
+        divisors,
+        divisors.copy(),
+        relation={(a, b) for a in divisors for b in divisors if b % a == 0},
+    )
+    assert divides.is_partial_order()
+    hasse = {(1, 2), (1, 3), (2, 4), (2, 6), (3, 6), (4, 12), (6, 12)}
+    assert set(divides.hasse_edges()) == hasse
+    reduction = divides.transitive_reduction()
+    assert set(reduction.relation) == hasse | {(x, x) for x in divisors}
+    assert reduction.transitive_closure() == divides
+    assert sorted(divides.covers(2)) == [4, 6]
+    assert list(divides.covers(12)) == []
+    assert divides.minimal_elements() == [1]
+    assert divides.maximal_elements() == [12]
+
+    shipped = BinaryRelation.from_hasse(hasse, divisors, reflexive=True)
+    assert (2, 12) in shipped and (4, 4) in shipped and (4, 6) not in shipped
+    assert shipped == divides and len(shipped) == len(divides)
+    shipped.add_pair((4, 6))
+    assert (4, 6) in shipped and len(shipped) == len(divides) + 1
+
+    divides.add_pair((12, 1))
+    with pytest.raises(ValueError):
+        divides.transitive_reduction()
+
+
+@pytest.mark.parametrize("backend", ["set", "sorted", "adjacency", "bitmatrix"])
+def test_image_preimage_and_ranges(backend):
+    elements = set(range(10))
+    relation = BinaryRelation(
+        elements,
+        elements.copy(),
+        relation={(a, b) for a in elements for b in elements if b == 2 * a % 10},
+        backend=backend,
+    )
+    assert relation.image(3) == {6} and relation.image(4) == {8}
+    assert relation.preimage(6) == {3, 8} and relation.preimage(1) == set()
+    assert relation.image_of_set({1, 2, 6}) == {2, 4}
+    assert list(relation.pairs_between(2, 5)) == [(2, 4), (3, 6), (4, 8)]
+    assert list(relation.pairs_between(8, 9, inclusive=True)) == [(8, 6), (9, 8)]
+
+    relation.add_pair((3, 7))
+    relation.remove_pair((4, 8))
+    assert relation.image(3) == {6, 7} and relation.preimage(8) == {9}
+    assert sorted(relation.pairs_between(2, 5)) == [(2, 4), (3, 6), (3, 7)]
+
+    sliced = relation.restriction(domain={3, 9}, codomain={7, 8})
+    assert set(sliced.relation) == {(3, 7), (9, 8)}
+    assert set(relation.restriction(codomain={0}).relation) == {(0, 0), (5, 0)}
+
+
+def test_image_of_computed_relations():
+    elements = set(range(6))
+    square = BinaryRelation.from_function(
+        elements, lambda x: x * x % 6, codomain=elements.copy()
+    )
+    assert square.image(4) == {4} and square.preimage(3) == {3}
+    assert square.image_of_set({1, 5}) == {1}
+    successor = BinaryRelation.from_function({1, 2, 3}, lambda x: x + 1)
+    assert successor.image(1) == {2} and successor.image(4) == set()
+    assert successor.image_of_set({1, 3}) == {2, 4}
+    less = BinaryRelation.from_predicate(lambda a, b: a < b, elements)
+    assert less.image(3) == {4, 5} and less.preimage(1) == {0}